@@ -1,9 +1,25 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import plotly.graph_objects as go
 import numpy as np
+import json
+import os
 from datetime import datetime
+from pathlib import Path
+
+import aggregates
+import charts
+import filters
+import geo
+import history
+import ingest
+import model
+import precompute
+import profiling
+
+# Copy-on-Write: los filtros de cada sesión son vistas del modelo compartido y no pueden modificarlo.
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
 
 st.set_page_config(page_title="Dashboard PLAN 986 (Sitios Complementarios)", layout="wide")
 
@@ -37,23 +53,87 @@ st.markdown("""
 st.image("10 Años.jpg", width=None)
 st.markdown("""<div style='text-align: center;'><h1 style='margin-top: 0;'>📍 Dashboard PLAN 986 (Sitios Complementarios)</h1><div style='font-size: 14px; color: gray; margin-top: 5px;'><em>By MLOPEZQ</em></div></div>""", unsafe_allow_html=True)
 
-@st.cache_data
-def load_data(uploaded_file):
-    df = pd.read_excel(uploaded_file, engine='openpyxl', dtype={'Estatus': str, 'Forecast Firma': str, 'Forecast Móvil': str})
-    df.columns = df.columns.str.strip()
-    df.dropna(subset=['Estatus'], inplace=True)
-    df['Complementario'] = df['Complementario'].astype(str).str.strip().str.lower()
-    df['Proyecto'] = df['Proyecto'].astype(str).str.strip().str.lower()
-    for col in ['Fecha Entrega a Construcción', 'Fecha TSS']:
-        if col in df.columns:
-            df[col] = pd.to_datetime(df[col], errors='coerce')
-    df = df[df['Estatus'].str.match(r'^\d+\.')].copy()
-    df['Estatus Limpio'] = df['Estatus'].str.replace(r'^\d+\.\-\s*', '', regex=True)
-    return df
+# Un solo modelo por archivo para todo el proceso (cache_resource no copia): las sesiones solo lo leen.
+# Se preparan todos los planes del archivo, separados por (Proyecto, Complementario).
+@st.cache_resource(show_spinner="Preparando datos...", max_entries=8)
+def load_model(file_hash, year, _source):
+    # _source son los bytes subidos o la ruta de un archivo de PLAN986_HISTORY_DIR, que solo se lee si no hay caché.
+    data = _source.read_bytes() if isinstance(_source, Path) else _source
+    return model.split_plans(model.prepare_model(ingest.load_workbook(data, file_hash), None, None, year))
+
+@st.cache_resource(show_spinner="Calculando agregados por plan...", max_entries=8)
+def load_plan_bundles(file_hash, year, plan_keys, _planes):
+    return aggregates.build_plan_bundles({plan: _planes[plan] for plan in plan_keys})
+
+@st.cache_resource(show_spinner="Indexando filtros...", max_entries=32)
+def load_filter_index(file_hash, plan, _df):
+    return filters.FilterIndex(_df)
+
+# Figuras memorizadas por el contenido de sus entradas: si no cambian, el rerun reutiliza la misma figura.
+@st.cache_resource(show_spinner=False, max_entries=64)
+def cached_figure(name, content_key, _build, _args):
+    return _build(*_args)
+
+def figure(name, build, *args):
+    return cached_figure(name, charts.content_hash(*args), build, args)
+
+@st.cache_resource(show_spinner="Cargando datos precalculados...", max_entries=8)
+def load_artifact_model(folder, generated_at):
+    return model.split_plans(precompute.load_model(folder))
+
+@st.cache_data(show_spinner="Cargando datos precalculados...")
+def load_artifact_bundle(folder, generated_at, gestor):
+    return precompute.load_bundle(folder, precompute.read_manifest(folder), gestor)
+
+@st.cache_data(show_spinner="Registrando snapshot...")
+def register_snapshot(label, file_hash, _data, mtime=None):
+    history.register(label, _data, file_hash, mtime)
+    return file_hash
+
+@st.cache_data(show_spinner="Registrando snapshot...")
+def register_history_file(path, mtime_ns):
+    data = Path(path).read_bytes()
+    return register_snapshot(Path(path).name, ingest.file_hash(data), data, mtime_ns / 1e9)
+
+@st.cache_data(show_spinner="Calculando histórico...")
+def load_history(entries_key):
+    entries = [{'label': label, 'digest': digest} for label, digest in entries_key]
+    return history.deltas(entries), history.status_trend(entries)
+
+PAGE_SIZE_OPTIONS = [25, 50, 100, 250]
+MAP_COLUMNS = ['Lat', 'Long', 'Nombre Sitio', 'Comuna', 'Gestor']
+COMMENTS_BATCH = 50
+MARKDOWN_ESPECIALES = r"([\\`*_{}\[\]()<>#+\-.!|~$])"
 
 def set_selected_status(status):
     st.session_state.selected_status = status
 
+def load_more_comments(key):
+    st.session_state[key] = st.session_state.get(key, COMMENTS_BATCH) + COMMENTS_BATCH
+
+def reset_comments(key):
+    st.session_state[key] = COMMENTS_BATCH
+
+def escape_markdown(serie):
+    # Los comentarios se unen en un solo st.markdown: un "**", "`", "$" o "<" suelto no debe romper los siguientes.
+    return serie.astype(str).str.replace(MARKDOWN_ESPECIALES, r"\\\1", regex=True)
+
+def search_rows(dataframe, text, columns):
+    # Búsqueda en el servidor: sin distinguir mayúsculas, sobre las columnas visibles.
+    if not text:
+        return dataframe
+    mask = np.zeros(len(dataframe), dtype=bool)
+    for col in columns:
+        mask |= dataframe[col].astype(str).str.contains(text, case=False, regex=False, na=False).to_numpy()
+    return dataframe[mask]
+
+def page_count(n_rows, page_size):
+    return max(1, -(-n_rows // page_size))
+
+def paginate(dataframe, page, page_size):
+    start = (page - 1) * page_size
+    return dataframe.iloc[start:start + page_size]
+
 def display_detail_view(title, dataframe):
     st.divider()
     col_header, col_button = st.columns([4, 1])
@@ -64,43 +144,115 @@ def display_detail_view(title, dataframe):
 
     columnas_info = ['AB+ALt', 'Nombre Sitio', 'Comuna', 'Región', 'Proyecto', 'Complementario', 'Renta', 'Lat', 'Long', 'Stopper']
     columnas_existentes = [col for col in columnas_info if col in dataframe.columns]
-    st.dataframe(dataframe[columnas_existentes], use_container_width=True)
+
+    # Solo se serializa la página visible: búsqueda, orden y corte se hacen aquí.
+    col_search, col_sort, col_order, col_size = st.columns([3, 2, 1, 1])
+    with col_search:
+        busqueda = st.text_input("Buscar", key=f"detail_search_{title}", placeholder="Sitio, comuna, stopper...")
+    with col_sort:
+        orden_col = st.selectbox("Ordenar por", [None] + columnas_existentes, format_func=lambda c: "Orden del archivo" if c is None else c, key=f"detail_sort_{title}")
+    with col_order:
+        descendente = st.selectbox("Orden", ["Ascendente", "Descendente"], key=f"detail_order_{title}") == "Descendente"
+    with col_size:
+        page_size = st.selectbox("Filas por página", PAGE_SIZE_OPTIONS, key=f"detail_page_size_{title}")
+
+    vista = search_rows(dataframe[columnas_existentes], busqueda, columnas_existentes)
+    if orden_col:
+        vista = vista.sort_values(orden_col, ascending=not descendente, kind='stable', na_position='last')
+
+    total_pages = page_count(len(vista), page_size)
+    page_key = f"detail_page_{title}"
+    if st.session_state.get(page_key, 1) > total_pages:
+        st.session_state[page_key] = total_pages
+    page = st.number_input(f"Página (de {total_pages})", min_value=1, max_value=total_pages, step=1, key=page_key)
+    pagina = paginate(vista, page, page_size)
+    st.dataframe(pagina, use_container_width=True)
+    if len(vista):
+        inicio = (page - 1) * page_size
+        st.caption(f"Mostrando {inicio + 1}–{inicio + len(pagina)} de {len(vista)} sitios")
+    else:
+        st.caption("Ningún sitio coincide con la búsqueda.")
 
     st.subheader("📝 Comentarios Asociados")
     with st.expander("Ver/Ocultar comentarios para esta selección"):
         comments_df = dataframe[['Nombre Sitio', 'Observaciones']].dropna()
         if not comments_df.empty:
-            for _, row in comments_df.iterrows():
-                st.markdown(f"**{row['Nombre Sitio']}**: {row['Observaciones']}")
+            limit_key = f"comments_limit_{title}"
+            busqueda_com = st.text_input("Buscar en comentarios", key=f"comments_search_{title}", on_change=reset_comments, args=(limit_key,))
+            comments_df = search_rows(comments_df, busqueda_com, ['Nombre Sitio', 'Observaciones'])
+            limite = st.session_state.get(limit_key, COMMENTS_BATCH)
+            visibles = comments_df.iloc[:limite]
+            if not visibles.empty:
+                st.markdown("\n\n".join("**" + escape_markdown(visibles['Nombre Sitio']) + "**: " + escape_markdown(visibles['Observaciones'])))
+            else:
+                st.caption("Ningún comentario coincide con la búsqueda.")
+            if limite < len(comments_df):
+                st.caption(f"Mostrando {limite} de {len(comments_df)} comentarios")
+                st.button("Cargar más comentarios", on_click=load_more_comments, args=(limit_key,), key=f"comments_more_{title}")
         else:
             st.info("No hay comentarios para los sitios en esta selección.")
 
-uploaded_file = st.file_uploader("Carga tu archivo Excel PLAN986.xlsx", type=["xlsx"])
-if uploaded_file is not None:
-    df_original = load_data(uploaded_file)
-    uploaded_file.seek(0)
-    df_tss_raw = pd.read_excel(uploaded_file, engine='openpyxl')
-    df_tss_raw.columns = df_tss_raw.columns.str.strip()
+perf = profiling.RenderProfiler(profiling.enabled_by_env() or st.session_state.get("debug_profile", False))
+perf.lap("Carga")
+uploaded_files = st.file_uploader("Carga tu archivo Excel PLAN986.xlsx (una o varias semanas)", type=["xlsx"], accept_multiple_files=True)
+guardar_snapshot = st.checkbox("Guardar los archivos subidos como snapshot semanal del histórico", value=False, key="save_snapshot",
+                               help="El histórico es compartido por todos los usuarios: marca esta opción solo para los archivos semanales oficiales.")
+# Los archivos de PLAN986_HISTORY_DIR siempre quedan en el histórico; los subidos, solo si se marca la opción.
+# El último archivo (subido o de la carpeta) es el que se muestra.
+# Se ordenan con la misma fecha que usa el histórico (history.snapshot_date), no por nombre: W9 va antes que W10.
+fuentes = []
+history_dir = os.environ.get("PLAN986_HISTORY_DIR")
+if history_dir:
+    for path in Path(history_dir).glob("*.xlsx"):
+        mtime_ns = path.stat().st_mtime_ns
+        fuentes.append((history.snapshot_date(path.name, mtime_ns / 1e9), register_history_file(str(path), mtime_ns), path))
+for archivo in uploaded_files or []:
+    data = archivo.getvalue()
+    file_hash = ingest.file_hash(data)
+    if guardar_snapshot:
+        register_snapshot(archivo.name, file_hash, data)
+    fuentes.append((history.snapshot_date(archivo.name), file_hash, data))
+fuentes.sort(key=lambda fuente: fuente[0])
+# Con PLAN986_ARTIFACTS_DIR (ver precompute.py) se leen los agregados ya calculados por el job.
+artifacts_dir = os.environ.get("PLAN986_ARTIFACTS_DIR")
+artifacts_manifest = precompute.read_manifest(artifacts_dir) if artifacts_dir else None
+# El año entra en la clave del modelo: un servidor que pasa Año Nuevo vuelve a resolver las fechas "W<n>" de TSS.
+anio_actual = datetime.now().year
+if fuentes:
+    _, file_hash, origen = fuentes[-1]
+    planes = load_model(file_hash, anio_actual, origen)
+elif artifacts_manifest:
+    file_hash = artifacts_manifest['file_hash']
+    planes = load_artifact_model(artifacts_dir, artifacts_manifest['generated_at'])
 else:
     st.warning("Por favor, sube el archivo Excel para continuar.")
     st.stop()
+if not planes:
+    st.warning("El archivo no tiene sitios con Proyecto y Complementario informados.")
+    st.stop()
 
-df = df_original[(df_original['Proyecto'] == 'plan 986') & (df_original['Complementario'] == 'si')]
-df['Sitio'] = df['AB+ALt'].astype(str) + " - " + df['Nombre Sitio'].astype(str)
-df = pd.merge(df, df_tss_raw[['AB+ALt', 'Fecha TSS']], on='AB+ALt', how='left', suffixes=('', '_raw'))
-df['Fecha TSS'] = df['Fecha TSS_raw']
-df.drop(columns=['Fecha TSS_raw'], inplace=True)
-
+perf.lap("Filtros")
 st.sidebar.header("Filtros")
-gestores = df['Gestor'].dropna().unique().tolist()
-gestor_sel = st.sidebar.selectbox("Seleccionar Gestor", ["Todos"] + sorted(gestores))
-df_filtrado = df.copy()
+plan_default = (model.PROYECTO, model.COMPLEMENTARIO)
+# Los agregados de cada plan se calculan una vez por archivo: cambiar de plan no recalcula nada.
+# El plan por defecto no se agrega aquí si los artifacts del job ya cubren este archivo.
+usa_artifacts = bool(artifacts_manifest) and artifacts_manifest['file_hash'] == file_hash
+plan_bundles = load_plan_bundles(file_hash, anio_actual, tuple(plan for plan in planes if not (usa_artifacts and plan == plan_default)), planes)
+opciones_plan = {f"{proyecto.title()} · Complementario: {complementario}": (proyecto, complementario) for proyecto, complementario in planes}
+etiquetas_plan = list(opciones_plan)
+plan_sel = opciones_plan[st.sidebar.selectbox("Plan", etiquetas_plan, index=list(planes).index(plan_default) if plan_default in planes else 0, key="plan")]
+es_plan_default = plan_sel == plan_default
+df = planes[plan_sel]
+indice = load_filter_index(file_hash, plan_sel, df)
+gestor_sel = st.sidebar.selectbox("Seleccionar Gestor", ["Todos"] + indice.options('Gestor'))
+# Posiciones de las filas seleccionadas (None = todas); cada filtro es una intersección sobre el índice.
+filas = None
 if gestor_sel != "Todos":
-    df_filtrado = df[df['Gestor'] == gestor_sel]
-sitios_filtrados = df_filtrado['Sitio'].dropna().unique().tolist()
-sitio_sel = st.sidebar.selectbox("Seleccionar Sitio", ["Todos"] + sorted(sitios_filtrados))
+    filas = indice.positions('Gestor', gestor_sel)
+sitio_sel = st.sidebar.selectbox("Seleccionar Sitio", ["Todos"] + indice.options('Sitio', filas))
 if sitio_sel != "Todos":
-    df_filtrado = df_filtrado[df_filtrado['Sitio'] == sitio_sel]
+    filas = indice.positions('Sitio', sitio_sel, filas)
+df_filtrado = filters.take(df, filas)
 if df_filtrado.empty:
     st.warning("⚠️ No se encontraron datos para los filtros seleccionados. Por favor, ajuste su selección.")
     st.stop()
@@ -108,11 +260,19 @@ if df_filtrado.empty:
 if 'selected_status' not in st.session_state:
     st.session_state.selected_status = None
 
+perf.lap("Agregados")
+agregados = None
+if usa_artifacts and es_plan_default and sitio_sel == "Todos":
+    agregados = load_artifact_bundle(artifacts_dir, artifacts_manifest['generated_at'], gestor_sel)
+if agregados is None and gestor_sel == "Todos" and sitio_sel == "Todos":
+    agregados = plan_bundles.get(plan_sel)
+if agregados is None:
+    agregados = aggregates.build_bundle(df_filtrado)
+
+perf.lap("SEGUIMIENTO")
 st.subheader("📊 SEGUIMIENTO")
-total_sitios_filtrados = len(df_filtrado)
-estatus_excluir = ['Eliminado', 'Standby']
-df_gestion_activa = df_filtrado[~df_filtrado['Estatus Limpio'].isin(estatus_excluir)]
-total_gestion_activa = len(df_gestion_activa)
+total_sitios_filtrados = agregados['seguimiento']['total_sitios']
+total_gestion_activa = agregados['seguimiento']['gestion_activa']
 
 # --- MÉTRICAS VISUALES ---
 l_spacer, col_total, col_activa, r_spacer = st.columns([1, 2, 2, 1])
@@ -127,6 +287,7 @@ if st.session_state.selected_status in ['ALL', 'ACTIVE']:
     if st.session_state.selected_status == 'ALL':
         display_detail_view(title="🗂️ Detalle: Total de Sitios", dataframe=df_filtrado)
     elif st.session_state.selected_status == 'ACTIVE':
+        df_gestion_activa = filters.take(df, indice.excluding('Estatus Limpio', aggregates.ESTATUS_EXCLUIR, filas))
         display_detail_view(title="⚙️ Detalle: Sitios en Gestión Activa", dataframe=df_gestion_activa)
 
 # --- FORECAST ---
@@ -135,189 +296,34 @@ st.subheader("FORECAST")
 tab1, tab2 = st.tabs(["FORECAST FIRMA ACUMULADO", "FORECAST FIRMA"])
 
 with tab1:
-    df_forecast = df_gestion_activa.copy()
-    df_forecast['Week_Forecast'] = pd.to_numeric(df_forecast['Forecast Firma'].str.extract(r'(\d+)')[0], errors='coerce')
-    df_forecast['Week_Real'] = pd.to_numeric(df_forecast['Week Firma'].str.extract(r'(\d+)')[0], errors='coerce')
-    df_forecast_forecast = df_forecast.dropna(subset=['Week_Forecast']).copy()
-    df_forecast_forecast['Week_Forecast'] = df_forecast_forecast['Week_Forecast'].astype(int)
-    df_forecast_real = df_forecast.dropna(subset=['Week_Real']).copy()
-    df_forecast_real['Week_Real'] = df_forecast_real['Week_Real'].astype(int)
-
-    min_week = 12
-    max_week = 40
-    weeks_forecast = list(range(min_week, max_week + 1))
-    last_real_week = df_forecast_real['Week_Real'].max()
-
-    fig = go.Figure()
-    forecast_weekly = df_forecast_forecast.groupby('Week_Forecast').size().reindex(weeks_forecast, fill_value=0).tolist()
-    forecast_cum = pd.Series(forecast_weekly).cumsum().tolist()
-
-    fig.add_trace(go.Scatter(
-        x=weeks_forecast,
-        y=forecast_cum,
-        mode='lines+markers+text',
-        name='Forecast Acumulado',
-        line=dict(color='royalblue', width=2, dash='dash'),
-        marker=dict(size=6, symbol='circle-open', line=dict(color='royalblue', width=2)),
-        text=[str(v) if v != 0 else "" for v in forecast_cum],
-        textposition="top center",
-        textfont=dict(size=9, color="royalblue")
-    ))
-
-    if not np.isnan(last_real_week):
-        last_real_week = int(last_real_week)
-        current_week = datetime.now().isocalendar().week
-        end_week = min(current_week, max_week)
-
-        weeks_real_exist = list(range(min_week, last_real_week + 1))
-        real_weekly_exist = df_forecast_real.groupby('Week_Real').size().reindex(weeks_real_exist, fill_value=0).tolist()
-        real_cum_exist = pd.Series(real_weekly_exist).cumsum()
-
-        last_value = real_cum_exist.iloc[-1] if len(real_cum_exist) > 0 else 0
-
-        weeks_real_full = list(range(min_week, end_week + 1))
-        if end_week > last_real_week:
-            extension = [last_value] * (end_week - last_real_week)
-            real_cum_full = real_cum_exist.tolist() + extension
-        else:
-            real_cum_full = real_cum_exist.tolist()
-
-        fig.add_trace(go.Scatter(
-            x=weeks_real_full,
-            y=real_cum_full,
-            mode='lines+markers+text',
-            name='Real Acumulado',
-            line=dict(color='red', width=2),
-            marker=dict(size=6, symbol='circle-open', line=dict(color='red', width=2)),
-            text=[str(v) if v != 0 else "" for v in real_cum_full],
-            textposition="top center",
-            textfont=dict(size=9, color="red")
-        ))
-    else:
+    perf.lap("FORECAST FIRMA ACUMULADO")
+    min_week = aggregates.MIN_WEEK
+    max_week = aggregates.MAX_WEEK
+    current_week = datetime.now().isocalendar().week
+    curvas = aggregates.forecast_curves(agregados['forecast_weekly'], current_week, min_week, max_week)
+    if curvas['real_cum'] is None:
         st.info("⚠️ No hay sitios con Week Firma para este filtro. Solo se muestra Forecast.")
-
-    fig.update_layout(
-        xaxis=dict(title="Semana", dtick=1, tickmode='linear',
-                   range=[min_week - 0.5, max_week + 0.5],
-                   tickvals=list(range(min_week, max_week + 1)),
-                   ticktext=[f"W{w}" for w in range(min_week, max_week + 1)],
-                   gridcolor='rgba(200, 200, 200, 0.3)', showgrid=True),
-        yaxis=dict(title="Q Firmas", rangemode='tozero', gridcolor='rgba(200, 200, 200, 0.3)', showgrid=True),
-        legend=dict(yanchor="top", y=0.99, xanchor="left", x=0.01),
-        template="simple_white"
-    )
+    fig = figure("Forecast acumulado", charts.forecast_cumulative, curvas, min_week, max_week)
+    perf.figure("Forecast acumulado", fig)
     st.plotly_chart(fig, use_container_width=True)
 with tab2:
-    if 'Forecast Firma' in df_gestion_activa.columns and 'Forecast Móvil' in df_gestion_activa.columns:
-        forecast_comp_df = df_gestion_activa.copy()
-        forecast_comp_df = forecast_comp_df[forecast_comp_df['Estatus Limpio'] != 'Firmado']
-        forecast_comp_df = forecast_comp_df.dropna(subset=['Forecast Firma', 'Forecast Móvil'])
-
-        forecast_comp_df['WeekNum_Original'] = pd.to_numeric(forecast_comp_df['Forecast Firma'].str.extract(r'(\d+)')[0], errors='coerce')
-        forecast_comp_df['WeekNum_Movil'] = pd.to_numeric(forecast_comp_df['Forecast Móvil'].str.extract(r'(\d+)')[0], errors='coerce')
-
-        forecast_comp_df.dropna(subset=['WeekNum_Original', 'WeekNum_Movil'], inplace=True)
-        forecast_comp_df[['WeekNum_Original', 'WeekNum_Movil']] = forecast_comp_df[['WeekNum_Original', 'WeekNum_Movil']].astype(int)
-
-        forecast_comp_df['Variacion'] = forecast_comp_df['WeekNum_Movil'] - forecast_comp_df['WeekNum_Original']
-
-        def get_status_and_color(v):
-            if v > 0: return 'Retrasado', '#d93025'  # Rojo
-            if v < 0: return 'Adelantado', '#1e8e3e'  # Verde
-            return 'En Fecha', '#1a73e8'  # Azul
-
-        forecast_comp_df[['Status', 'Color']] = forecast_comp_df['Variacion'].apply(get_status_and_color).apply(pd.Series)
-
-        forecast_comp_df.sort_values(by=['WeekNum_Movil', 'Sitio'], ascending=[True, True], inplace=True)
-
+    perf.lap("FORECAST FIRMA")
+    forecast_comp_df = agregados['forecast_comparison']
+    if forecast_comp_df is not None:
         if forecast_comp_df.empty:
             st.info("No hay sitios con 'Forecast Firma' y 'Forecast Móvil' válidos para comparar.")
         else:
-            fig = go.Figure()
-            legend_added = set()
-
-            for _, row in forecast_comp_df.iterrows():
-                y_pos = row['Sitio']
-                x_orig = row['WeekNum_Original']
-                x_movil = row['WeekNum_Movil']
-                color = row['Color']
-                status = row['Status']
-
-                show_legend = status not in legend_added
-                if show_legend:
-                    legend_added.add(status)
-
-                if row['Variacion'] == 0:
-                    fig.add_trace(go.Scatter(
-                        x=[x_movil], y=[y_pos],
-                        mode='markers+text',
-                        text=[str(x_movil)],
-                        textposition='middle right',
-                        textfont=dict(color='DarkSlateGrey', size=12),
-                        marker=dict(color=color, size=12, symbol='circle', line=dict(width=1, color='DarkSlateGrey')),
-                        hoverinfo='text',
-                        hovertext=f"<b>{row['Sitio']}</b><br>Forecast: W{x_movil}<br><b>(En Fecha)</b>",
-                        name=status,
-                        legendgroup=status,
-                        showlegend=show_legend
-                    ))
-                else:
-                    fig.add_shape(type='line', x0=x_orig, y0=y_pos, x1=x_movil, y1=y_pos,
-                                  line=dict(color='rgba(128, 128, 128, 0.5)', width=1.5, dash='dot'))
-
-                    fig.add_trace(go.Scatter(
-                        x=[x_orig], y=[y_pos],
-                        mode='markers+text',
-                        text=[str(x_orig)],
-                        textposition='middle left',
-                        textfont=dict(color='grey', size=10),
-                        marker=dict(color='grey', size=8, symbol='circle'),
-                        hoverinfo='text',
-                        hovertext=f"<b>{row['Sitio']}</b><br>F. Original: W{x_orig}",
-                        showlegend=False
-                    ))
-
-                    variacion_str = f"+{row['Variacion']}" if row['Variacion'] > 0 else str(row['Variacion'])
-                    hover_text_movil = f"<b>{row['Sitio']}</b><br>F. Móvil: W{x_movil}<br>F. Original: W{x_orig}<br>Variación: {variacion_str} semanas"
-
-                    fig.add_trace(go.Scatter(
-                        x=[x_movil], y=[y_pos],
-                        mode='markers+text',
-                        text=[str(x_movil)],
-                        textposition='middle right',
-                        textfont=dict(color='DarkSlateGrey', size=12),
-                        marker=dict(color=color, size=12, symbol='circle', line=dict(width=1, color='DarkSlateGrey')),
-                        hoverinfo='text',
-                        hovertext=hover_text_movil,
-                        name=status,
-                        legendgroup=status,
-                        showlegend=show_legend
-                    ))
-
-            fig.update_layout(
-                yaxis_title=None,
-                xaxis_title="Semana",
-                height=200 + len(forecast_comp_df) * 40,
-                yaxis=dict(type='category', categoryorder='array', categoryarray=forecast_comp_df['Sitio'].tolist()),
-                margin=dict(l=250, r=40, t=80, b=40),
-                plot_bgcolor='rgba(0,0,0,0)',
-                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1, title_text='')
-            )
-
-            current_week = datetime.now().isocalendar().week
-            fig.add_vline(x=current_week, line_width=2, line_dash="dash", line_color="purple",
-                          annotation_text="Semana Actual", annotation_position="top left", annotation_font_color="purple")
-
+            fig = figure("Forecast firma", charts.forecast_dumbbell, forecast_comp_df, datetime.now().isocalendar().week)
+            perf.figure("Forecast firma", fig)
             st.plotly_chart(fig, use_container_width=True)
 
     else:
         st.info("Para ver la comparación, asegúrese de que el archivo Excel contenga las columnas 'Forecast Firma' y 'Forecast Móvil'.")
 
+perf.lap("Resumen ESTATUS")
 st.subheader("📈 Resumen ESTATUS")
 if 'Estatus' in df_filtrado.columns:
-    status_counts = df_filtrado.groupby(['Estatus', 'Estatus Limpio']).agg(Cantidad=("Sitio", "count")).reset_index()
-    status_counts['Orden'] = status_counts['Estatus'].str.extract(r'(\d+)').astype(int)
-    status_counts = status_counts.sort_values('Orden', ascending=True).reset_index(drop=True)
+    status_counts = agregados['status_counts']
     num_cols = 5
     cols = st.columns(num_cols)
     for i, row in status_counts.iterrows():
@@ -327,88 +333,126 @@ if 'Estatus' in df_filtrado.columns:
                 st.button("Ver Detalle", key=f"btn_{row['Estatus Limpio']}", on_click=set_selected_status, args=(row['Estatus Limpio'],), use_container_width=True)
 
     if st.session_state.selected_status and st.session_state.selected_status not in ['ALL', 'ACTIVE']:
-        detalle_df = df_filtrado[df_filtrado['Estatus Limpio'] == st.session_state.selected_status]
+        detalle_df = filters.take(df, indice.positions('Estatus Limpio', st.session_state.selected_status, filas))
         display_detail_view(title=f"🔎 Detalle: Estatus {st.session_state.selected_status}", dataframe=detalle_df)
 
+perf.lap("Stopper")
 st.divider()
 st.subheader("📊 Detalle por Stopper (Sitios en Gestión Activa)")
-if 'Stopper' in df_filtrado.columns and not df_gestion_activa.empty:
-    stopper_df = df_gestion_activa.copy()
-    stopper_df['Stopper'] = stopper_df['Stopper'].fillna("Sin Stopper")
-    stopper_counts = stopper_df.groupby('Stopper').agg(Cantidad=('Sitio', 'count'), Sitios=('Sitio', lambda x: '<br>'.join(x))).reset_index()
-    fig_stopper = px.bar(stopper_counts, x='Cantidad', y='Stopper', orientation='h', text='Cantidad', custom_data=['Sitios'], color='Cantidad', color_continuous_scale=px.colors.sequential.Purples)
-    fig_stopper.update_layout(yaxis={'categoryorder': 'total ascending'}, showlegend=False, coloraxis_showscale=False, height=300 + len(stopper_counts) * 30)
-    fig_stopper.update_traces(textposition='inside', hovertemplate='<b>%{y}</b><br>Cantidad: %{x}<br><br>%{customdata[0]}<extra></extra>')
+stopper_counts = agregados['stopper_counts']
+if stopper_counts is not None:
+    fig_stopper = figure("Stopper", charts.stopper_bar, stopper_counts)
+    perf.figure("Stopper", fig_stopper)
     st.plotly_chart(fig_stopper, use_container_width=True)
 else:
     st.info("No hay sitios en gestión activa o sin columna Stopper.")
 
 # --- CRONOGRAMA TSS ---
+perf.lap("TSS")
 st.divider()
 st.subheader("📅 Cronograma de TSS")
 
-def parse_tss_date(value):
-    if pd.isna(value):
-        return None
-    if isinstance(value, (datetime, pd.Timestamp)):
-        return value
-    if isinstance(value, str):
-        value_lower = value.lower().strip()
-        if value_lower.startswith('w'):
-            try:
-                week_num = int(value_lower.replace('w', ''))
-                current_year = datetime.now().year
-                return datetime.fromisocalendar(current_year, week_num, 1)
-            except (ValueError, TypeError):
-                return None
-    return pd.to_datetime(value, errors='coerce')
-
-if 'Fecha TSS' in df_gestion_activa.columns:
-    tss_df = df_gestion_activa.dropna(subset=['Fecha TSS']).copy()
-    tss_df['SortableDate'] = tss_df['Fecha TSS'].apply(parse_tss_date)
-    tss_df = tss_df.dropna(subset=['SortableDate']).sort_values('SortableDate')
-
+tss_df = agregados['tss']
+if tss_df is not None:
     expander_title = f"Ver Cronograma de TSS ({len(tss_df)} sitios con fecha)"
     with st.expander(expander_title):
         if not tss_df.empty:
-            today = datetime.now().date()
             current_isocal = datetime.now().isocalendar()
-            start_of_week = datetime.fromisocalendar(current_isocal.year, current_isocal.week, 1).date()
-            end_of_week = datetime.fromisocalendar(current_isocal.year, current_isocal.week, 7).date()
-
-            for _, row in tss_df.iterrows():
-                site_name = row['Sitio']
-                tss_date = row['SortableDate'].date()
-                original_format = row['Fecha TSS']
-
-                if isinstance(original_format, (datetime, pd.Timestamp)):
-                    display_date = original_format.strftime('%d-%m-%Y')
-                else:
-                    display_date = str(original_format).strip()
-
-                if tss_date < start_of_week:
-                    status_icon = "✅"
-                    status_text = "(Realizada)"
-                elif start_of_week <= tss_date <= end_of_week:
-                    status_icon = "🎯"
-                    status_text = "(Semana Actual)"
-                else:
-                    status_icon = "🗓️"
-                    status_text = "(En Programación)"
-
-                st.markdown(f"{status_icon} **{site_name}**: {display_date} {status_text}")
+            start_of_week = pd.Timestamp(datetime.fromisocalendar(current_isocal.year, current_isocal.week, 1))
+            end_of_week = pd.Timestamp(datetime.fromisocalendar(current_isocal.year, current_isocal.week, 7))
+
+            icono_tss, estado_tss = aggregates.tss_states(tss_df['Fecha TSS Orden'], start_of_week, end_of_week)
+            # tss_states devuelve arreglos NumPy de texto: concatenarlos con str solo funciona desde NumPy 2.
+            icono_tss, estado_tss = pd.Series(icono_tss, index=tss_df.index), pd.Series(estado_tss, index=tss_df.index)
+            lineas_tss = icono_tss + " **" + tss_df['Sitio'].astype(str) + "**: " + tss_df['Fecha TSS Display'] + " " + estado_tss
+            st.markdown("\n\n".join(lineas_tss))
         else:
             st.info("No hay sitios en gestión activa con una fecha de TSS programada.")
 else:
     st.info("La columna 'Fecha TSS' no se encontró en los datos.")
 
 # --- MAPA ---
+perf.lap("Mapa")
 st.divider()
 st.subheader("🌐 Georeferencia")
 mapa_df = df_filtrado.dropna(subset=['Lat', 'Long'])
-if not mapa_df.empty:
-    fig_mapa = px.scatter_mapbox(mapa_df, lat="Lat", lon="Long", zoom=4, hover_name="Nombre Sitio", hover_data={"Comuna": True, "Gestor": True}, color_discrete_sequence=["mediumpurple"])
-    fig_mapa.update_layout(mapbox_style="open-street-map", margin={"r":0,"t":0,"l":0,"b":0})
+if mapa_df.empty:
+    st.info("No hay coordenadas disponibles para mostrar en el mapa.")
+elif len(mapa_df) <= geo.CLUSTER_MIN_POINTS:
+    fig_mapa = figure("Mapa", charts.sites_map, mapa_df[MAP_COLUMNS], 4)
+    perf.figure("Mapa", fig_mapa)
     st.plotly_chart(fig_mapa, use_container_width=True, config={"scrollZoom": True})
 else:
-    st.info("No hay coordenadas disponibles para mostrar en el mapa.")
+    # Streamlit no informa el zoom del mapa al servidor: el nivel de detalle y el centro se eligen aquí.
+    col_zoom, col_centro = st.columns([2, 2])
+    zona_col = 'Región' if 'Región' in mapa_df.columns else 'Comuna'
+    with col_zoom:
+        zoom_mapa = st.slider("Zoom del mapa", min_value=3, max_value=14, value=4, key="map_zoom")
+    with col_centro:
+        zonas = sorted(mapa_df[zona_col].dropna().astype(str).unique().tolist())
+        zona_sel = st.selectbox(f"Centrar en {zona_col}", ["Todos"] + zonas, key="map_center")
+    zona_df = mapa_df if zona_sel == "Todos" else mapa_df[mapa_df[zona_col].astype(str) == zona_sel]
+    centro = {"lat": float(zona_df['Lat'].median()), "lon": float(zona_df['Long'].median())}
+
+    if zoom_mapa < geo.DETAIL_ZOOM:
+        # Se envían todos los clusters (son pocos): el servidor no se entera si el usuario desplaza el mapa.
+        clusters_df = geo.clusters(mapa_df, zoom_mapa)
+        fig_mapa = figure("Mapa clusters", charts.clusters_map, clusters_df, zoom_mapa, centro)
+        st.caption(f"{len(mapa_df)} sitios agrupados en {len(clusters_df)} clusters. Aumente el zoom a {geo.DETAIL_ZOOM} o más para ver sitios individuales.")
+    else:
+        visibles_df = geo.in_viewport(mapa_df, geo.viewport(centro["lat"], centro["lon"], zoom_mapa))
+        fig_mapa = figure("Mapa", charts.sites_map, visibles_df[MAP_COLUMNS], zoom_mapa, centro)
+        st.caption(f"Mostrando {len(visibles_df)} de {len(mapa_df)} sitios dentro de la vista.")
+    perf.figure("Mapa", fig_mapa)
+    st.plotly_chart(fig_mapa, use_container_width=True, config={"scrollZoom": True})
+
+# --- HISTÓRICO ---
+perf.lap("Histórico")
+# Los snapshots del histórico guardan solo el plan por defecto.
+entradas_historial = history.read_manifest() if es_plan_default else []
+if len(entradas_historial) >= 2:
+    st.divider()
+    st.subheader("🕒 Histórico semanal")
+    deltas_df, tendencia_df = load_history(tuple((e['label'], e['digest']) for e in entradas_historial))
+    if gestor_sel != "Todos":
+        deltas_df = deltas_df[deltas_df['Gestor'] == gestor_sel]
+        tendencia_df = tendencia_df[tendencia_df['Gestor'] == gestor_sel]
+    etiquetas = [e['label'] for e in entradas_historial]
+
+    snapshot_sel = st.selectbox("¿Qué se movió en...?", etiquetas[1:][::-1], key="history_snapshot")
+    movimientos = deltas_df[deltas_df['Snapshot'] == snapshot_sel]
+    conteo_tipos = movimientos['Tipo'].value_counts()
+    tipos = [history.CAMBIO_ESTATUS, history.CAMBIO_FORECAST, history.NUEVO_STOPPER, history.SITIO_NUEVO, history.SITIO_RETIRADO]
+    for col, tipo in zip(st.columns(len(tipos)), tipos):
+        with col:
+            st.metric(label=tipo, value=int(conteo_tipos.get(tipo, 0)))
+    with st.expander(f"Ver movimientos ({len(movimientos)})"):
+        st.dataframe(movimientos.drop(columns=['Snapshot']), use_container_width=True, hide_index=True)
+
+    tab_estatus, tab_movimientos = st.tabs(["ESTATUS POR SEMANA", "MOVIMIENTOS POR SEMANA"])
+    with tab_estatus:
+        serie_estatus = tendencia_df.groupby(['Snapshot', 'Estatus Limpio']).agg(Cantidad=('Cantidad', 'sum')).reset_index()
+        fig_tendencia = px.line(serie_estatus, x='Snapshot', y='Cantidad', color='Estatus Limpio', markers=True, category_orders={'Snapshot': etiquetas})
+        fig_tendencia.update_layout(xaxis_title=None, yaxis_title="Q Sitios", template="simple_white")
+        perf.figure("Histórico estatus", fig_tendencia)
+        st.plotly_chart(fig_tendencia, use_container_width=True)
+    with tab_movimientos:
+        serie_movimientos = deltas_df.groupby(['Snapshot', 'Tipo']).size().rename('Cantidad').reset_index()
+        fig_movimientos = px.bar(serie_movimientos, x='Snapshot', y='Cantidad', color='Tipo', category_orders={'Snapshot': etiquetas[1:], 'Tipo': tipos})
+        fig_movimientos.update_layout(xaxis_title=None, yaxis_title="Q Movimientos", template="simple_white")
+        perf.figure("Histórico movimientos", fig_movimientos)
+        st.plotly_chart(fig_movimientos, use_container_width=True)
+
+# --- PERFILADO ---
+st.sidebar.divider()
+st.sidebar.toggle("⏱️ Perfilado de la página", key="debug_profile", help=f"También se activa con {profiling.PROFILE_ENV}=1.")
+if perf.enabled:
+    perfil = perf.finish(file_hash=file_hash[:12], plan=" · ".join(plan_sel), gestor=gestor_sel, sitio=sitio_sel)
+    profiling.append_jsonl(perfil)
+    with st.sidebar.expander("Tiempos de esta ejecución", expanded=True):
+        st.metric("Total", f"{perfil['total_ms']:.0f} ms")
+        st.dataframe(pd.DataFrame(perfil['sections']), hide_index=True, use_container_width=True)
+        if perfil['figures']:
+            st.dataframe(pd.DataFrame(perfil['figures']), hide_index=True, use_container_width=True)
+        st.caption(f"Registro JSON lines: {profiling.PROFILE_LOG}")
+        st.download_button("Descargar JSON", json.dumps(perfil, ensure_ascii=False), file_name="perfil.json", mime="application/json")
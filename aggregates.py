@@ -0,0 +1,160 @@
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import parsing
+
+ESTATUS_EXCLUIR = ['Eliminado', 'Standby']
+MIN_WEEK = 12
+MAX_WEEK = 40
+# Desde este total de filas los bundles de cada plan se calculan en procesos aparte. Por debajo
+# manda el costo de levantar procesos (~2 s) y de copiar cada grupo: 100k filas se agregan en ~0.4 s.
+PARALLEL_MIN_ROWS = 1_000_000
+# Sitios listados en el hover de cada barra de Stopper; el resto se resume como "… y N más".
+STOPPER_HOVER_SITES = 15
+
+# Archivos de un bundle de agregados: nombre -> formato en disco.
+BUNDLE_FILES = {
+    'seguimiento': 'json',
+    'forecast_weekly': 'parquet',
+    'forecast_comparison': 'parquet',
+    'status_counts': 'parquet',
+    'stopper_counts': 'parquet',
+    'tss': 'parquet',
+}
+
+
+def active_sites(df):
+    return df[~df['Estatus Limpio'].isin(ESTATUS_EXCLUIR)]
+
+
+def seguimiento(df, df_activa):
+    return {'total_sitios': int(len(df)), 'gestion_activa': int(len(df_activa))}
+
+
+def forecast_weekly(df_activa):
+    forecast = df_activa['Week Forecast'].dropna().astype(int).value_counts()
+    real = df_activa['Week Real'].dropna().astype(int).value_counts()
+    weekly = pd.DataFrame({'Forecast': forecast, 'Real': real}).fillna(0).astype(int).sort_index()
+    weekly.index.name = 'Semana'
+    return weekly
+
+
+def forecast_curves(weekly, current_week, min_week=MIN_WEEK, max_week=MAX_WEEK):
+    weeks_forecast = list(range(min_week, max_week + 1))
+    forecast_cum = weekly['Forecast'].reindex(weeks_forecast, fill_value=0).cumsum().tolist()
+    curvas = {'weeks_forecast': weeks_forecast, 'forecast_cum': forecast_cum, 'weeks_real': None, 'real_cum': None}
+
+    semanas_real = weekly.index[weekly['Real'] > 0]
+    if len(semanas_real):
+        last_real_week = int(semanas_real.max())
+        end_week = min(current_week, max_week)
+        real_cum_exist = weekly['Real'].reindex(range(min_week, last_real_week + 1), fill_value=0).cumsum().tolist()
+        last_value = real_cum_exist[-1] if real_cum_exist else 0
+        if end_week > last_real_week:
+            real_cum_exist += [last_value] * (end_week - last_real_week)
+        curvas['weeks_real'] = list(range(min_week, end_week + 1))
+        curvas['real_cum'] = real_cum_exist
+    return curvas
+
+
+def forecast_comparison(df_activa):
+    if 'Week Forecast' not in df_activa.columns or 'Week Móvil' not in df_activa.columns:
+        return None
+    comp = df_activa[df_activa['Estatus Limpio'] != 'Firmado'].dropna(subset=['Week Forecast', 'Week Móvil'])
+    comp = pd.DataFrame({
+        'Sitio': comp['Sitio'],
+        'WeekNum_Original': comp['Week Forecast'].astype(int),
+        'WeekNum_Movil': comp['Week Móvil'].astype(int),
+    })
+    comp['Variacion'] = comp['WeekNum_Movil'] - comp['WeekNum_Original']
+    comp['Status'] = parsing.classify_variation(comp['Variacion'])
+    return comp.sort_values(by=['WeekNum_Movil', 'Sitio'], ascending=[True, True])
+
+
+def status_counts(df):
+    return df.groupby(['Estatus Orden', 'Estatus', 'Estatus Limpio'], observed=True).agg(Cantidad=("Sitio", "count")).reset_index()
+
+
+def hover_sites(sitios, limit=STOPPER_HOVER_SITES):
+    nombres = sitios.astype(str).tolist()
+    texto = '<br>'.join(nombres[:limit])
+    if len(nombres) > limit:
+        texto += f"<br>… y {len(nombres) - limit} más"
+    return texto
+
+
+def stopper_counts(df_activa):
+    if 'Stopper' not in df_activa.columns or df_activa.empty:
+        return None
+    stopper_df = df_activa.assign(Stopper=df_activa['Stopper'].astype(object).fillna("Sin Stopper"))
+    return stopper_df.groupby('Stopper').agg(Cantidad=('Sitio', 'count'), Sitios=('Sitio', hover_sites)).reset_index()
+
+
+def tss_schedule(df_activa):
+    if 'Fecha TSS Orden' not in df_activa.columns:
+        return None
+    tss = df_activa.dropna(subset=['Fecha TSS Orden']).sort_values('Fecha TSS Orden', kind='stable')
+    return tss[['Sitio', 'Fecha TSS Orden', 'Fecha TSS Display']].reset_index(drop=True)
+
+
+def tss_states(fechas, start_of_week, end_of_week):
+    fechas = fechas.dt.normalize()
+    condiciones = [fechas < start_of_week, fechas <= end_of_week]
+    icono = np.select(condiciones, ["✅", "🎯"], default="🗓️")
+    estado = np.select(condiciones, ["(Realizada)", "(Semana Actual)"], default="(En Programación)")
+    return icono, estado
+
+
+def build_bundle(df):
+    df_activa = active_sites(df)
+    return {
+        'seguimiento': seguimiento(df, df_activa),
+        'forecast_weekly': forecast_weekly(df_activa),
+        'forecast_comparison': forecast_comparison(df_activa),
+        'status_counts': status_counts(df),
+        'stopper_counts': stopper_counts(df_activa),
+        'tss': tss_schedule(df_activa),
+    }
+
+
+def build_plan_bundles(planes, workers=None):
+    total = sum(len(grupo) for grupo in planes.values())
+    if total < PARALLEL_MIN_ROWS or len(planes) < 2 or (os.cpu_count() or 1) < 2:
+        return {plan: build_bundle(grupo) for plan, grupo in planes.items()}
+    # spawn y no fork: el servidor de Streamlit tiene hilos corriendo.
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return dict(zip(planes, pool.map(build_bundle, planes.values())))
+
+
+def save_bundle(bundle, folder):
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    for name, formato in BUNDLE_FILES.items():
+        value = bundle[name]
+        path = folder / f"{name}.{formato}"
+        if value is None:
+            path.unlink(missing_ok=True)
+        elif formato == 'json':
+            path.write_text(json.dumps(value, ensure_ascii=False, indent=2), encoding='utf-8')
+        else:
+            value.to_parquet(path)
+
+
+def load_bundle(folder):
+    folder = Path(folder)
+    bundle = {}
+    for name, formato in BUNDLE_FILES.items():
+        path = folder / f"{name}.{formato}"
+        if not path.exists():
+            bundle[name] = None
+        elif formato == 'json':
+            bundle[name] = json.loads(path.read_text(encoding='utf-8'))
+        else:
+            bundle[name] = pd.read_parquet(path)
+    return bundle
@@ -0,0 +1,180 @@
+"""Benchmark de la página completa con libros sintéticos, usando AppTest de Streamlit.
+
+Uso: python benchmarks/bench_app.py [--rows 1000 10000 100000] [--json resultados.json]
+
+Cada tamaño corre en un proceso aparte con caché vacía (PLAN986_CACHE_DIR temporal) y
+el libro se entrega a la página vía PLAN986_HISTORY_DIR, porque AppTest no puede usar
+st.file_uploader. Se mide la ingesta (parseo del Excel y lectura del snapshot Parquet),
+la primera ejecución de la página, la latencia de cada interacción y los bytes de las
+figuras Plotly que se envían al navegador. El pico de memoria (tracemalloc) se mide en
+otro proceso, también con caché vacía, para no inflar los tiempos: cubre la ejecución en
+frío completa (parseo del Excel, snapshot, modelo, índices, agregados y figuras) más las
+mismas interacciones.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT = BENCH_DIR.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(BENCH_DIR))
+
+import synthetic  # noqa: E402
+
+TIMEOUT = 600
+
+
+def figure_bytes(at):
+    return sum(len(chart.proto.spec) for chart in at.get('plotly_chart'))
+
+
+def sidebar_selectbox(at, label):
+    return next(selectbox for selectbox in at.sidebar.selectbox if selectbox.label == label)
+
+
+def interactions(at):
+    # Cada paso modifica un widget sobre la sesión anterior; el tiempo medido es el del rerun.
+    gestor = lambda: sidebar_selectbox(at, "Seleccionar Gestor")
+    sitio = lambda: sidebar_selectbox(at, "Seleccionar Sitio")
+    gestores = gestor().options
+    pasos = [
+        ("Ver detalle de todos", lambda: at.button(key="btn_all_sites").click()),
+        ("Página 2 del detalle", lambda: at.number_input(key="detail_page_🗂️ Detalle: Total de Sitios").set_value(2)),
+        ("Ocultar detalle", lambda: at.button(key="hide_detail_btn_🗂️ Detalle: Total de Sitios").click()),
+    ]
+    if len(gestores) > 1:
+        pasos.append(("Seleccionar gestor", lambda: gestor().select(gestores[1])))
+        pasos.append(("Seleccionar sitio", lambda: sitio().select(sitio().options[1])))
+        pasos.append(("Volver a todos", lambda: (sitio().select("Todos"), gestor().select("Todos"))))
+    pasos.append(("Ver detalle de estatus", lambda: next(b for b in at.button if b.key and b.key.startswith("btn_") and b.key[4:] not in ('all_sites', 'active_sites')).click()))
+    pasos.append(("Zoom del mapa", lambda: at.slider(key="map_zoom").set_value(11)))
+    if len(sidebar_selectbox(at, "Plan").options) > 1:
+        pasos.append(("Cambiar de plan", lambda: sidebar_selectbox(at, "Plan").select_index(0)))
+    return pasos
+
+
+def run_page():
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(ROOT / "DASH986.py"), default_timeout=TIMEOUT)
+    inicio = time.perf_counter()
+    at.run()
+    resultado = {'first_run_s': time.perf_counter() - inicio, 'first_run_figure_bytes': figure_bytes(at), 'interactions': []}
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    for nombre, accion in interactions(at):
+        try:
+            accion()
+        except (KeyError, StopIteration, IndexError):
+            continue
+        inicio = time.perf_counter()
+        at.run()
+        resultado['interactions'].append({
+            'interaction': nombre,
+            'rerun_s': time.perf_counter() - inicio,
+            'figure_bytes': figure_bytes(at),
+        })
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+    return resultado
+
+
+def bench_single(workbook):
+    # Se ejecuta en el proceso hijo: las variables de entorno ya apuntan a la caché temporal.
+    import ingest
+
+    # La primera ejecución es la de un archivo nuevo: parsea el Excel y escribe el snapshot.
+    resultado = run_page()
+
+    data = Path(workbook).read_bytes()
+    inicio = time.perf_counter()
+    df = ingest.read_workbook(data)
+    resultado['ingest_parse_s'] = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    ingest.load_workbook(data, ingest.file_hash(data))
+    resultado['ingest_snapshot_s'] = time.perf_counter() - inicio
+    resultado['rows'] = len(df)
+    return resultado
+
+
+def bench_memory():
+    # Proceso y caché nuevos: la pasada parte sin snapshot en disco ni cachés de Streamlit.
+    import streamlit as st
+
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    tracemalloc.start()
+    run_page()
+    pico = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return {'peak_memory_mb': pico}
+
+
+def bench(rows, data_dir):
+    workbook = Path(data_dir) / f"PLAN986_{rows}.xlsx"
+    if not workbook.exists():
+        print(f"Generando {workbook}...", file=sys.stderr)
+        synthetic.write_workbook(rows, workbook)
+    resultado = {'workbook_rows': rows}
+    resultado.update(run_child(["--single", str(workbook)], workbook, rows))
+    resultado.update(run_child(["--memory"], workbook, rows))
+    return resultado
+
+
+def run_child(args, workbook, rows):
+    with tempfile.TemporaryDirectory() as tmp:
+        fuente = Path(tmp) / "fuente"
+        fuente.mkdir()
+        os.symlink(workbook.resolve(), fuente / workbook.name)
+        env = dict(os.environ, PLAN986_CACHE_DIR=str(Path(tmp) / "cache"), PLAN986_HISTORY_DIR=str(fuente))
+        env.pop("PLAN986_ARTIFACTS_DIR", None)
+        env.pop("PLAN986_PROFILE", None)
+        proceso = subprocess.run([sys.executable, __file__, *args], cwd=ROOT, env=env,
+                                 capture_output=True, text=True, check=False)
+    if proceso.returncode:
+        raise RuntimeError(f"Falló el benchmark de {rows} filas:\n{proceso.stderr}")
+    return json.loads(proceso.stdout.strip().splitlines()[-1])
+
+
+def report(resultado):
+    print(f"\n== {resultado['workbook_rows']:,} filas ({resultado['rows']:,} con estatus) ==")
+    print(f"Ingesta: parseo Excel {resultado['ingest_parse_s'] * 1000:.0f} ms, snapshot Parquet {resultado['ingest_snapshot_s'] * 1000:.0f} ms")
+    print(f"Primera ejecución: {resultado['first_run_s'] * 1000:.0f} ms, figuras {resultado['first_run_figure_bytes'] / 1024:.0f} KiB")
+    for paso in resultado['interactions']:
+        print(f"  {paso['interaction']:<24} {paso['rerun_s'] * 1000:>8.0f} ms  {paso['figure_bytes'] / 1024:>8.0f} KiB")
+    print(f"Pico de memoria en frío (tracemalloc): {resultado['peak_memory_mb']:.1f} MiB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--data-dir', default=BENCH_DIR / 'data', help="Carpeta de los libros sintéticos (se generan si faltan)")
+    parser.add_argument('--json', help="Guarda los resultados en este archivo")
+    parser.add_argument('--single', help=argparse.SUPPRESS)
+    parser.add_argument('--memory', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.single:
+        print(json.dumps(bench_single(args.single)))
+        return
+    if args.memory:
+        print(json.dumps(bench_memory()))
+        return
+
+    resultados = []
+    for rows in args.rows:
+        resultados.append(bench(rows, args.data_dir))
+        report(resultados[-1])
+    if args.json:
+        Path(args.json).write_text(json.dumps(resultados, ensure_ascii=False, indent=2), encoding='utf-8')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Micro-benchmark del parseo de semanas/estatus y la clasificación de variaciones.
+
+Uso: python benchmarks/bench_parsing.py [--rows 100000] [--repeat 5]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import parsing  # noqa: E402
+
+ESTATUS = ['1.- Búsqueda', '2.- Negociación', '3.- Firmado', '4.- Eliminado', '5.- Standby', '6.- En Construcción']
+
+
+def synthetic_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    weeks = np.array([f"W{w}" for w in range(1, 53)] + [f"w {w}" for w in range(1, 53)] + [None], dtype=object)
+    return pd.DataFrame({
+        'Estatus': rng.choice(ESTATUS, rows),
+        'Forecast Firma': rng.choice(weeks, rows),
+        'Week Firma': rng.choice(weeks, rows),
+        'Forecast Móvil': rng.choice(weeks, rows),
+    })
+
+
+def legacy(df):
+    df = df.copy()
+    df['Week_Forecast'] = pd.to_numeric(df['Forecast Firma'].str.extract(r'(\d+)')[0], errors='coerce')
+    df['Week_Real'] = pd.to_numeric(df['Week Firma'].str.extract(r'(\d+)')[0], errors='coerce')
+    df['WeekNum_Movil'] = pd.to_numeric(df['Forecast Móvil'].str.extract(r'(\d+)')[0], errors='coerce')
+    df['Orden'] = df['Estatus'].str.extract(r'(\d+)').astype(int)
+    comp = df.dropna(subset=['Week_Forecast', 'WeekNum_Movil']).copy()
+    comp['Variacion'] = comp['WeekNum_Movil'] - comp['Week_Forecast']
+
+    def get_status_and_color(v):
+        if v > 0: return 'Retrasado', '#d93025'
+        if v < 0: return 'Adelantado', '#1e8e3e'
+        return 'En Fecha', '#1a73e8'
+
+    comp[['Status', 'Color']] = comp['Variacion'].apply(get_status_and_color).apply(pd.Series)
+    return comp
+
+
+def vectorized(df):
+    df = parsing.parse_number_columns(df.copy())
+    comp = df.dropna(subset=['Week Forecast', 'Week Móvil']).copy()
+    comp['Variacion'] = comp['Week Móvil'] - comp['Week Forecast']
+    comp['Status'] = parsing.classify_variation(comp['Variacion'])
+    return comp
+
+
+def best_of(func, df, repeat):
+    tiempos = []
+    for _ in range(repeat):
+        inicio = time.perf_counter()
+        func(df)
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    df = synthetic_frame(args.rows)
+    esperado = legacy(df)
+    obtenido = vectorized(df)
+    assert (esperado['Status'].to_numpy() == obtenido['Status'].astype(str).to_numpy()).all()
+
+    t_legacy = best_of(legacy, df, args.repeat)
+    t_vectorized = best_of(vectorized, df, args.repeat)
+    print(f"filas: {args.rows:,}")
+    print(f"legacy (str.extract + apply):      {t_legacy * 1000:9.1f} ms")
+    print(f"vectorizado (factorize + select):  {t_vectorized * 1000:9.1f} ms")
+    print(f"speedup: {t_legacy / t_vectorized:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
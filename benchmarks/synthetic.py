@@ -0,0 +1,119 @@
+"""Genera libros PLAN986.xlsx sintéticos con las columnas que usa el dashboard.
+
+Uso: python benchmarks/synthetic.py --rows 1000 10000 100000 --out benchmarks/data
+"""
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ESTATUS = [
+    '1.- Búsqueda', '2.- Negociación', '3.- Firmado', '4.- Permisos', '5.- En Construcción',
+    '6.- Construido', '7.- Eliminado', '8.- Standby',
+]
+ESTATUS_PESOS = [0.12, 0.15, 0.2, 0.12, 0.12, 0.14, 0.08, 0.07]
+PROYECTOS = ['Plan 986', 'plan 986 ', 'Plan 1000', 'Plan 1100']
+PROYECTOS_PESOS = [0.45, 0.15, 0.25, 0.15]
+REGIONES = {
+    'RM': ('Santiago', 'Maipú', 'Ñuñoa', 'Puente Alto', 'La Florida'),
+    'V': ('Valparaíso', 'Viña del Mar', 'Quilpué'),
+    'VIII': ('Concepción', 'Talcahuano', 'Los Ángeles'),
+    'IX': ('Temuco', 'Angol'),
+}
+STOPPERS = ['Permiso municipal', 'Vecinos', 'Propietario', 'Factibilidad eléctrica', 'DGAC', None]
+STOPPERS_PESOS = [0.1, 0.08, 0.07, 0.05, 0.03, 0.67]
+OBSERVACIONES = ['Pendiente firma de contrato', 'Esperando visita técnica', 'Propietario solicita mayor renta', 'Sin novedades', None]
+# Columnas que el dashboard no usa, para simular exportaciones anchas.
+EXTRA_COLUMNS = 25
+
+
+def _weeks(rng, rows, low, high, missing):
+    semanas = rng.integers(low, high, rows)
+    formato = rng.random(rows)
+    valores = np.where(formato < 0.8, np.char.add('W', semanas.astype(str)), np.char.add('w ', semanas.astype(str))).astype(object)
+    valores[rng.random(rows) < missing] = None
+    return valores
+
+
+def synthetic_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    anio = datetime.now().year
+    regiones = rng.choice(list(REGIONES), rows, p=[0.5, 0.2, 0.2, 0.1])
+    comuna = np.empty(rows, dtype=object)
+    for region in REGIONES:
+        mask = regiones == region
+        comuna[mask] = rng.choice(REGIONES[region], int(mask.sum()))
+    centros = {'RM': (-33.45, -70.65), 'V': (-33.05, -71.6), 'VIII': (-36.82, -73.05), 'IX': (-38.74, -72.6)}
+    lat = np.array([centros[r][0] for r in regiones]) + rng.normal(0, 0.25, rows)
+    lon = np.array([centros[r][1] for r in regiones]) + rng.normal(0, 0.25, rows)
+    sin_coordenadas = rng.random(rows) < 0.05
+    lat[sin_coordenadas] = np.nan
+    lon[sin_coordenadas] = np.nan
+
+    forecast_firma = _weeks(rng, rows, 10, 45, 0.15)
+    forecast_movil = forecast_firma.copy()
+    cambia = rng.random(rows) < 0.6
+    forecast_movil[cambia] = _weeks(rng, int(cambia.sum()), 10, 50, 0.05)
+
+    # Fecha TSS mezcla fechas reales, semanas "W<n>", fechas en texto y textos inválidos.
+    tipo_tss = rng.random(rows)
+    fechas = pd.Timestamp(anio, 1, 1) + pd.to_timedelta(rng.integers(0, 365, rows), unit='D')
+    fecha_tss = np.array(fechas.to_pydatetime(), dtype=object)
+    semanas_tss = np.char.add('W', rng.integers(1, 53, rows).astype(str)).astype(object)
+    texto_tss = np.array(fechas.strftime('%d-%m-%Y'), dtype=object)
+    fecha_tss = np.where(tipo_tss < 0.35, semanas_tss, fecha_tss)
+    fecha_tss = np.where((tipo_tss >= 0.35) & (tipo_tss < 0.45), texto_tss, fecha_tss)
+    fecha_tss = np.where((tipo_tss >= 0.45) & (tipo_tss < 0.47), 'por definir', fecha_tss)
+    fecha_tss[tipo_tss >= 0.75] = None
+
+    df = pd.DataFrame({
+        'Estatus': rng.choice(ESTATUS, rows, p=ESTATUS_PESOS),
+        'AB+ALt': [f"AB{i:07d}" for i in range(rows)],
+        'Nombre Sitio': [f"Sitio {i}" for i in range(rows)],
+        'Comuna': comuna,
+        'Región': regiones,
+        'Proyecto': rng.choice(PROYECTOS, rows, p=PROYECTOS_PESOS),
+        'Complementario': rng.choice(['SI', 'si ', 'No'], rows, p=[0.5, 0.3, 0.2]),
+        'Renta': rng.integers(150, 1500, rows) * 1000,
+        'Lat': lat,
+        'Long': lon,
+        'Stopper': rng.choice(np.array(STOPPERS, dtype=object), rows, p=STOPPERS_PESOS),
+        'Gestor': rng.choice(['Ana Pérez', 'Luis Soto', 'Pedro Rojas', 'María Díaz', 'José Muñoz', None], rows),
+        'Observaciones': rng.choice(np.array(OBSERVACIONES, dtype=object), rows),
+        'Forecast Firma': forecast_firma,
+        'Forecast Móvil': forecast_movil,
+        'Week Firma': _weeks(rng, rows, 10, 40, 0.6),
+        'Fecha TSS': fecha_tss,
+        'Fecha Entrega a Construcción': fechas + pd.to_timedelta(rng.integers(30, 120, rows), unit='D'),
+    })
+    # Algunos encabezados vienen con espacios y algunas filas sin estatus o con estatus sin prefijo.
+    df = df.rename(columns={'Gestor': 'Gestor ', 'Stopper': ' Stopper'})
+    df.loc[rng.random(rows) < 0.01, 'Estatus'] = None
+    df.loc[rng.random(rows) < 0.01, 'Estatus'] = 'Sin estatus'
+    for i in range(EXTRA_COLUMNS):
+        df[f"Campo {i + 1}"] = rng.integers(0, 1000, rows) if i % 2 else rng.choice(['A', 'B', 'C'], rows)
+    return df
+
+
+def write_workbook(rows, path, seed=0):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    synthetic_frame(rows, seed).to_excel(path, index=False, engine='openpyxl')
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--out', default=Path(__file__).resolve().parent / 'data')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    for rows in args.rows:
+        path = write_workbook(rows, Path(args.out) / f"PLAN986_{rows}.xlsx", args.seed)
+        print(f"{path} ({rows:,} filas)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+import parsing
+
+
+def content_hash(*parts):
+    # Huella del contenido de las entradas de una figura: DataFrames/Series por valores e índice,
+    # el resto por su repr.
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, (pd.DataFrame, pd.Series)):
+            columnas = list(part.columns) if isinstance(part, pd.DataFrame) else [part.name]
+            digest.update(repr(columnas).encode())
+            digest.update(pd.util.hash_pandas_object(part, index=True).to_numpy().tobytes())
+        else:
+            digest.update(repr(part).encode())
+    return digest.hexdigest()
+
+
+def forecast_cumulative(curvas, min_week, max_week):
+    weeks_forecast = curvas['weeks_forecast']
+    forecast_cum = curvas['forecast_cum']
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=weeks_forecast,
+        y=forecast_cum,
+        mode='lines+markers+text',
+        name='Forecast Acumulado',
+        line=dict(color='royalblue', width=2, dash='dash'),
+        marker=dict(size=6, symbol='circle-open', line=dict(color='royalblue', width=2)),
+        text=[str(v) if v != 0 else "" for v in forecast_cum],
+        textposition="top center",
+        textfont=dict(size=9, color="royalblue")
+    ))
+
+    if curvas['real_cum'] is not None:
+        weeks_real_full = curvas['weeks_real']
+        real_cum_full = curvas['real_cum']
+
+        fig.add_trace(go.Scatter(
+            x=weeks_real_full,
+            y=real_cum_full,
+            mode='lines+markers+text',
+            name='Real Acumulado',
+            line=dict(color='red', width=2),
+            marker=dict(size=6, symbol='circle-open', line=dict(color='red', width=2)),
+            text=[str(v) if v != 0 else "" for v in real_cum_full],
+            textposition="top center",
+            textfont=dict(size=9, color="red")
+        ))
+
+    fig.update_layout(
+        xaxis=dict(title="Semana", dtick=1, tickmode='linear',
+                   range=[min_week - 0.5, max_week + 0.5],
+                   tickvals=list(range(min_week, max_week + 1)),
+                   ticktext=[f"W{w}" for w in range(min_week, max_week + 1)],
+                   gridcolor='rgba(200, 200, 200, 0.3)', showgrid=True),
+        yaxis=dict(title="Q Firmas", rangemode='tozero', gridcolor='rgba(200, 200, 200, 0.3)', showgrid=True),
+        legend=dict(yanchor="top", y=0.99, xanchor="left", x=0.01),
+        template="simple_white"
+    )
+    return fig
+
+
+def forecast_dumbbell(forecast_comp_df, current_week):
+    fig = go.Figure()
+    sitios = forecast_comp_df['Sitio'].astype(str)
+    x_orig = forecast_comp_df['WeekNum_Original']
+    x_movil = forecast_comp_df['WeekNum_Movil']
+
+    # Un solo trazo de conectores: cada sitio aporta (original, móvil, None) para cortar la línea.
+    con_cambio = (forecast_comp_df['Variacion'] != 0).to_numpy()
+    n_cambio = int(con_cambio.sum())
+    if n_cambio:
+        conector_x = np.full(n_cambio * 3, None, dtype=object)
+        conector_y = np.full(n_cambio * 3, None, dtype=object)
+        conector_x[0::3] = x_orig[con_cambio].to_numpy()
+        conector_x[1::3] = x_movil[con_cambio].to_numpy()
+        conector_y[0::3] = sitios[con_cambio].to_numpy()
+        conector_y[1::3] = sitios[con_cambio].to_numpy()
+        fig.add_trace(go.Scatter(
+            x=conector_x, y=conector_y,
+            mode='lines',
+            line=dict(color='rgba(128, 128, 128, 0.5)', width=1.5, dash='dot'),
+            hoverinfo='skip',
+            showlegend=False
+        ))
+
+        fig.add_trace(go.Scatter(
+            x=x_orig[con_cambio], y=sitios[con_cambio],
+            mode='markers+text',
+            text=x_orig[con_cambio].astype(str),
+            textposition='middle left',
+            textfont=dict(color='grey', size=10),
+            marker=dict(color='grey', size=8, symbol='circle'),
+            hoverinfo='text',
+            hovertext="<b>" + sitios[con_cambio] + "</b><br>F. Original: W" + x_orig[con_cambio].astype(str),
+            showlegend=False
+        ))
+
+    variacion_str = np.where(forecast_comp_df['Variacion'] > 0, "+", "") + forecast_comp_df['Variacion'].astype(str)
+    hover_text_movil = np.where(
+        con_cambio,
+        "<b>" + sitios + "</b><br>F. Móvil: W" + x_movil.astype(str) + "<br>F. Original: W" + x_orig.astype(str) + "<br>Variación: " + variacion_str + " semanas",
+        "<b>" + sitios + "</b><br>Forecast: W" + x_movil.astype(str) + "<br><b>(En Fecha)</b>"
+    )
+
+    for status in forecast_comp_df['Status'].unique():
+        en_status = (forecast_comp_df['Status'] == status).to_numpy()
+        fig.add_trace(go.Scatter(
+            x=x_movil[en_status], y=sitios[en_status],
+            mode='markers+text',
+            text=x_movil[en_status].astype(str),
+            textposition='middle right',
+            textfont=dict(color='DarkSlateGrey', size=12),
+            marker=dict(color=parsing.STATUS_COLORS[status], size=12, symbol='circle', line=dict(width=1, color='DarkSlateGrey')),
+            hoverinfo='text',
+            hovertext=hover_text_movil[en_status],
+            name=status,
+            legendgroup=status,
+            showlegend=True
+        ))
+
+    fig.update_layout(
+        yaxis_title=None,
+        xaxis_title="Semana",
+        height=200 + len(forecast_comp_df) * 40,
+        yaxis=dict(type='category', categoryorder='array', categoryarray=forecast_comp_df['Sitio'].tolist()),
+        margin=dict(l=250, r=40, t=80, b=40),
+        plot_bgcolor='rgba(0,0,0,0)',
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1, title_text='')
+    )
+
+    fig.add_vline(x=current_week, line_width=2, line_dash="dash", line_color="purple",
+                  annotation_text="Semana Actual", annotation_position="top left", annotation_font_color="purple")
+    return fig
+
+
+def stopper_bar(stopper_counts):
+    fig_stopper = px.bar(stopper_counts, x='Cantidad', y='Stopper', orientation='h', text='Cantidad', custom_data=['Sitios'], color='Cantidad', color_continuous_scale=px.colors.sequential.Purples)
+    fig_stopper.update_layout(yaxis={'categoryorder': 'total ascending'}, showlegend=False, coloraxis_showscale=False, height=300 + len(stopper_counts) * 30)
+    fig_stopper.update_traces(textposition='inside', hovertemplate='<b>%{y}</b><br>Cantidad: %{x}<br><br>%{customdata[0]}<extra></extra>')
+    return fig_stopper
+
+
+def sites_map(mapa_df, zoom, center=None):
+    fig_mapa = px.scatter_mapbox(mapa_df, lat="Lat", lon="Long", zoom=zoom, center=center, hover_name="Nombre Sitio", hover_data={"Comuna": True, "Gestor": True}, color_discrete_sequence=["mediumpurple"])
+    fig_mapa.update_layout(mapbox_style="open-street-map", margin={"r":0,"t":0,"l":0,"b":0})
+    return fig_mapa
+
+
+def clusters_map(clusters_df, zoom, center):
+    fig_mapa = px.scatter_mapbox(clusters_df, lat="Lat", lon="Long", size="Cantidad", size_max=40, zoom=zoom, center=center,
+                                 hover_data={"Cantidad": True, "Lat": False, "Long": False}, color_discrete_sequence=["mediumpurple"])
+    fig_mapa.update_layout(mapbox_style="open-street-map", margin={"r":0,"t":0,"l":0,"b":0})
+    return fig_mapa
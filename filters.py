@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+INDEX_COLUMNS = ['Gestor', 'Sitio', 'Estatus Limpio', 'Stopper']
+SIN_FILAS = np.array([], dtype=np.intp)
+
+
+class FilterIndex:
+    # Índice invertido valor -> posiciones de fila (ordenadas), construido una vez por archivo.
+    # Los filtros combinados son intersecciones de posiciones, sin recorrer el DataFrame completo.
+    def __init__(self, df, columns=INDEX_COLUMNS):
+        self.n_rows = len(df)
+        self.codes = {}
+        self.values = {}
+        self.rows = {}
+        for col in columns:
+            if col not in df.columns:
+                continue
+            serie = df[col]
+            if isinstance(serie.dtype, pd.CategoricalDtype):
+                codes, values = serie.cat.codes.to_numpy(), serie.cat.categories
+            else:
+                codes, values = pd.factorize(serie, sort=True)
+            orden = np.argsort(codes, kind='stable')
+            limites = np.searchsorted(codes[orden], np.arange(len(values) + 1))
+            self.codes[col] = codes
+            self.values[col] = values.tolist()
+            self.rows[col] = {valor: orden[inicio:fin] for valor, inicio, fin in zip(self.values[col], limites[:-1], limites[1:]) if fin > inicio}
+
+    def options(self, col, rows=None):
+        if rows is None:
+            return list(self.rows[col])
+        presentes = np.unique(self.codes[col][rows])
+        return [self.values[col][code] for code in presentes if code >= 0]
+
+    def positions(self, col, value, rows=None):
+        encontradas = self.rows[col].get(value, SIN_FILAS)
+        return encontradas if rows is None else np.intersect1d(rows, encontradas, assume_unique=True)
+
+    def excluding(self, col, values, rows=None):
+        restantes = np.arange(self.n_rows) if rows is None else rows
+        for value in values:
+            restantes = np.setdiff1d(restantes, self.rows[col].get(value, SIN_FILAS), assume_unique=True)
+        return restantes
+
+
+def take(df, rows):
+    return df if rows is None else df.iloc[rows]
@@ -0,0 +1,55 @@
+import numpy as np
+
+# Niveles de zoom con celdas precalculadas; cada celda mide ~1/4 de tesela (64 px) en ese zoom.
+CLUSTER_ZOOMS = (2, 4, 6, 8, 10)
+# Desde este zoom se dibujan los sitios individuales en vez de clusters.
+DETAIL_ZOOM = 11
+# Con menos puntos que esto se mantiene el mapa de un solo trazo, sin clusters.
+CLUSTER_MIN_POINTS = 1500
+# Tamaño aproximado del mapa en pantalla, para estimar la ventana visible.
+VIEWPORT_PX = (1200, 450)
+
+
+def cell_column(zoom):
+    return f'Celda Z{zoom}'
+
+
+def cell_size(zoom):
+    return 360 / 2 ** zoom / 4
+
+
+def assign_cells(df):
+    lat = df['Lat'].to_numpy(dtype='float64', na_value=np.nan)
+    lon = df['Long'].to_numpy(dtype='float64', na_value=np.nan)
+    validas = ~(np.isnan(lat) | np.isnan(lon))
+    for zoom in CLUSTER_ZOOMS:
+        size = cell_size(zoom)
+        columnas = int(np.ceil(360 / size)) + 1
+        fila = np.floor((np.where(validas, lat, 0) + 90) / size)
+        col = np.floor((np.where(validas, lon, 0) + 180) / size)
+        df[cell_column(zoom)] = np.where(validas, fila * columnas + col, -1).astype('int32')
+    return df
+
+
+def cluster_zoom(zoom):
+    niveles = [z for z in CLUSTER_ZOOMS if z <= zoom]
+    return niveles[-1] if niveles else CLUSTER_ZOOMS[0]
+
+
+def clusters(df, zoom):
+    celda = cell_column(cluster_zoom(zoom))
+    agrupado = df[df[celda] >= 0].groupby(celda).agg(Lat=('Lat', 'mean'), Long=('Long', 'mean'), Cantidad=('Lat', 'size'))
+    return agrupado.reset_index(drop=True)
+
+
+def viewport(center_lat, center_lon, zoom):
+    # Grados visibles a cada lado del centro (proyección Mercator aproximada en la latitud central).
+    ancho, alto = VIEWPORT_PX
+    lon_half = 360 / 2 ** zoom * ancho / 256 / 2
+    lat_half = 360 / 2 ** zoom * alto / 256 / 2 * np.cos(np.radians(center_lat))
+    return center_lat - lat_half, center_lat + lat_half, center_lon - lon_half, center_lon + lon_half
+
+
+def in_viewport(df, bounds):
+    lat_min, lat_max, lon_min, lon_max = bounds
+    return df[df['Lat'].between(lat_min, lat_max) & df['Long'].between(lon_min, lon_max)]
@@ -0,0 +1,214 @@
+import json
+import os
+import re
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import pandas as pd
+
+import ingest
+import model
+
+HISTORY_DIR = ingest.CACHE_DIR / "history"
+MANIFEST_PATH = HISTORY_DIR / "manifest.json"
+LOCK_PATH = HISTORY_DIR / "manifest.lock"
+# Subir este número cuando cambie diff_snapshots, para recalcular los deltas guardados.
+DELTA_VERSION = 2
+
+SNAPSHOT_COLUMNS = ['AB+ALt', 'Sitio', 'Gestor', 'Estatus Limpio', 'Estatus Orden', 'Week Móvil', 'Stopper']
+DELTA_COLUMNS = ['AB+ALt', 'Sitio', 'Gestor', 'Tipo', 'Desde', 'Hacia', 'Semanas']
+DELTA_DTYPES = {'Sitio': 'string', 'Gestor': 'string', 'Tipo': 'string', 'Desde': 'string', 'Hacia': 'string', 'Semanas': 'Int32'}
+
+CAMBIO_ESTATUS = 'Cambio de estatus'
+CAMBIO_FORECAST = 'Cambio Forecast Móvil'
+NUEVO_STOPPER = 'Nuevo Stopper'
+SITIO_NUEVO = 'Sitio nuevo'
+SITIO_RETIRADO = 'Sitio retirado'
+
+FECHA_EN_NOMBRE = re.compile(r'(\d{4})-(\d{2})-(\d{2})|(\d{2})-(\d{2})-(\d{4})')
+SEMANA_EN_NOMBRE = re.compile(r'(?<![a-z])w\s*(\d{1,2})(?!\d)', re.IGNORECASE)
+# Un archivo "W<n>" puede guardarse unas semanas antes de que empiece esa semana.
+SEMANAS_ADELANTO = 4
+
+
+def read_manifest():
+    if not MANIFEST_PATH.exists():
+        return []
+    return json.loads(MANIFEST_PATH.read_text(encoding='utf-8'))
+
+
+def _write_manifest(entries):
+    HISTORY_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = MANIFEST_PATH.with_suffix('.tmp')
+    tmp_path.write_text(json.dumps(entries, ensure_ascii=False, indent=2), encoding='utf-8')
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+@contextmanager
+def _manifest_lock():
+    # Varias sesiones (o procesos) pueden registrar a la vez: la lectura y escritura del manifiesto van bajo un lock de archivo.
+    HISTORY_DIR.mkdir(parents=True, exist_ok=True)
+    with open(LOCK_PATH, 'a+b') as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        else:
+            lock.seek(0)
+            msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+            else:
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def compact_snapshot(df_model):
+    columnas = [col for col in SNAPSHOT_COLUMNS if col in df_model.columns]
+    snap = df_model[columnas].drop_duplicates('AB+ALt', keep='last').reset_index(drop=True)
+    snap['AB+ALt'] = snap['AB+ALt'].astype(str)
+    for col in ['Sitio', 'Gestor', 'Estatus Limpio', 'Stopper']:
+        if col in snap.columns:
+            snap[col] = snap[col].astype(object).where(snap[col].notna()).astype('string')
+    return snap
+
+
+def snapshot_path(digest):
+    return HISTORY_DIR / f"{digest}.parquet"
+
+
+def snapshot_date(name, mtime=None):
+    # Semana a la que corresponde un archivo: la fecha o "W<n>" de su nombre; si no tiene, su fecha de
+    # modificación (PLAN986_HISTORY_DIR) o, para los archivos subidos, el momento de la carga.
+    encontrado = FECHA_EN_NOMBRE.search(name)
+    if encontrado:
+        anio, mes, dia, dia2, mes2, anio2 = encontrado.groups()
+        try:
+            return datetime(int(anio or anio2), int(mes or mes2), int(dia or dia2))
+        except ValueError:
+            pass
+    referencia = datetime.fromtimestamp(mtime) if mtime is not None else datetime.now()
+    encontrado = SEMANA_EN_NOMBRE.search(name)
+    if encontrado:
+        # "W<n>" no trae año: se toma la última semana n que no quede más de SEMANAS_ADELANTO después de la
+        # fecha del archivo, así un W52 de diciembre sigue antes que el W1 siguiente aunque se cargue en enero.
+        anio = referencia.isocalendar()[0]
+        limite = referencia + timedelta(weeks=SEMANAS_ADELANTO)
+        candidatas = []
+        for anio_semana in (anio - 1, anio, anio + 1):
+            try:
+                candidatas.append(datetime.fromisocalendar(anio_semana, int(encontrado.group(1)), 1))
+            except ValueError:
+                pass
+        candidatas = [fecha for fecha in candidatas if fecha <= limite]
+        if candidatas:
+            return max(candidatas)
+    return referencia
+
+
+def register(label, data, digest=None, mtime=None):
+    # Solo se parsea el archivo si su contenido no está ya en el historial.
+    digest = digest or ingest.file_hash(data)
+    entries = read_manifest()
+    if any(entry['digest'] == digest for entry in entries):
+        return entries
+    path = snapshot_path(digest)
+    if path.exists():
+        rows = len(pd.read_parquet(path, columns=['AB+ALt']))
+    else:
+        snap = compact_snapshot(model.prepare_model(ingest.load_workbook(data, digest)))
+        HISTORY_DIR.mkdir(parents=True, exist_ok=True)
+        snap.to_parquet(path)
+        rows = len(snap)
+    fecha = snapshot_date(label, mtime)
+    with _manifest_lock():
+        # Se vuelve a leer bajo el lock: otra sesión pudo registrar este u otro archivo mientras se parseaba.
+        entries = read_manifest()
+        if any(entry['digest'] == digest for entry in entries):
+            return entries
+        # Los archivos semanales suelen llamarse igual: la etiqueta lleva la fecha del archivo y se hace única.
+        base = f"{fecha:%d-%m-%Y} · {label}"
+        etiquetas = {entry['label'] for entry in entries}
+        label, n = base, 2
+        while label in etiquetas:
+            label, n = f"{base} ({n})", n + 1
+        entries.append({'label': label, 'digest': digest, 'rows': rows, 'sort_key': fecha.isoformat()})
+        # deltas() compara entradas consecutivas: el orden es el de la semana del archivo, no el de llegada.
+        # Las entradas antiguas sin sort_key quedan primero; los deltas de pares nuevos se calculan al pedirlos.
+        entries.sort(key=lambda entry: entry.get('sort_key', ''))
+        _write_manifest(entries)
+    return entries
+
+
+def load_snapshot(digest):
+    return pd.read_parquet(snapshot_path(digest))
+
+
+def diff_snapshots(prev, curr):
+    merged = prev.merge(curr, on='AB+ALt', how='outer', suffixes=(' Anterior', ''), indicator=True)
+    merged['Sitio'] = merged['Sitio'].fillna(merged['Sitio Anterior'])
+    merged['Gestor'] = merged['Gestor'].fillna(merged['Gestor Anterior'])
+    ambos = merged['_merge'] == 'both'
+    partes = []
+
+    def agregar(mask, tipo, desde, hacia, semanas=None):
+        if not mask.any():
+            return
+        parte = merged.loc[mask, ['AB+ALt', 'Sitio', 'Gestor']].assign(Tipo=tipo, Desde=desde[mask], Hacia=hacia[mask])
+        parte['Semanas'] = semanas[mask] if semanas is not None else pd.NA
+        partes.append(parte.astype(DELTA_DTYPES))
+
+    cambio_estatus = ambos & (merged['Estatus Limpio Anterior'] != merged['Estatus Limpio']).fillna(False)
+    agregar(cambio_estatus, CAMBIO_ESTATUS, merged['Estatus Limpio Anterior'], merged['Estatus Limpio'])
+
+    if {'Week Móvil', 'Week Móvil Anterior'} <= set(merged.columns):
+        semanas = merged['Week Móvil'] - merged['Week Móvil Anterior']
+        cambio_forecast = ambos & semanas.fillna(0).ne(0)
+        agregar(cambio_forecast, CAMBIO_FORECAST, "W" + merged['Week Móvil Anterior'].astype('string'),
+                "W" + merged['Week Móvil'].astype('string'), semanas)
+
+    if {'Stopper', 'Stopper Anterior'} <= set(merged.columns):
+        nuevo_stopper = ambos & merged['Stopper'].notna() & (merged['Stopper Anterior'].isna() | (merged['Stopper Anterior'] != merged['Stopper']).fillna(True))
+        agregar(nuevo_stopper, NUEVO_STOPPER, merged['Stopper Anterior'], merged['Stopper'])
+
+    agregar(merged['_merge'] == 'right_only', SITIO_NUEVO, pd.Series(pd.NA, index=merged.index, dtype='string'), merged['Estatus Limpio'])
+    agregar(merged['_merge'] == 'left_only', SITIO_RETIRADO, merged['Estatus Limpio Anterior'], pd.Series(pd.NA, index=merged.index, dtype='string'))
+
+    if not partes:
+        return pd.DataFrame(columns=DELTA_COLUMNS).astype(DELTA_DTYPES)
+    return pd.concat(partes, ignore_index=True)[DELTA_COLUMNS]
+
+
+def load_delta(prev_digest, curr_digest):
+    # Cada par de snapshots consecutivos se compara una sola vez y queda guardado en disco.
+    path = HISTORY_DIR / f"delta_{prev_digest[:16]}_{curr_digest[:16]}-v{DELTA_VERSION}.parquet"
+    if path.exists():
+        return pd.read_parquet(path)
+    delta = diff_snapshots(load_snapshot(prev_digest), load_snapshot(curr_digest))
+    delta.to_parquet(path)
+    return delta
+
+
+def deltas(entries):
+    partes = []
+    for prev, curr in zip(entries, entries[1:]):
+        partes.append(load_delta(prev['digest'], curr['digest']).assign(Snapshot=curr['label']))
+    if not partes:
+        return pd.DataFrame(columns=DELTA_COLUMNS + ['Snapshot'])
+    return pd.concat(partes, ignore_index=True)
+
+
+def status_trend(entries):
+    partes = []
+    for entry in entries:
+        snap = load_snapshot(entry['digest'])
+        conteo = snap.groupby(['Gestor', 'Estatus Limpio'], dropna=False).size().rename('Cantidad').reset_index()
+        partes.append(conteo.assign(Snapshot=entry['label']))
+    return pd.concat(partes, ignore_index=True)
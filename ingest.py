@@ -0,0 +1,143 @@
+import hashlib
+import io
+import operator
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+# Carpeta local donde se guardan los snapshots Parquet de cada archivo cargado.
+CACHE_DIR = Path(os.environ.get("PLAN986_CACHE_DIR", Path(__file__).resolve().parent / ".cache"))
+# Subir este número cuando cambie el esquema limpio, para invalidar snapshots antiguos.
+SNAPSHOT_VERSION = 2
+
+# Columnas del Excel que usa el dashboard; el resto de la hoja no se materializa.
+COLUMNS = ['Estatus', 'AB+ALt', 'Nombre Sitio', 'Comuna', 'Región', 'Proyecto', 'Complementario', 'Renta',
+           'Lat', 'Long', 'Stopper', 'Gestor', 'Observaciones', 'Forecast Firma', 'Forecast Móvil', 'Week Firma',
+           'Fecha TSS', 'Fecha Entrega a Construcción']
+REQUIRED_COLUMNS = ['Estatus', 'Proyecto', 'Complementario']
+TEXT_COLUMNS = ['Estatus', 'Forecast Firma', 'Forecast Móvil']
+LOWER_COLUMNS = ['Proyecto', 'Complementario']
+NUMERIC_COLUMNS = ['Lat', 'Long']
+DATE_COLUMNS = ['Fecha Entrega a Construcción', 'Fecha TSS']
+ESTATUS_VALIDO = re.compile(r'^\d+\.')
+ESTATUS_PREFIJO = re.compile(r'^\d+\.\-\s*')
+
+
+def file_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _normalize_mixed_columns(df):
+    # Arrow no admite columnas object con tipos mezclados (p. ej. números y textos en 'Renta').
+    for col in df.columns[df.dtypes == object]:
+        if pd.api.types.infer_dtype(df[col], skipna=True) in ('mixed', 'mixed-integer'):
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+
+
+def _cell_text(value):
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def _cell_number(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    try:
+        return float(str(value).strip())
+    except ValueError:
+        return np.nan
+
+
+def _read_sheet(data):
+    # Lectura en modo solo lectura: se recorren las filas una vez y solo se guardan las celdas de COLUMNS
+    # de las filas con un Estatus válido ("N.- ...").
+    wb = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        filas = wb.worksheets[0].iter_rows(values_only=True)
+        encabezado = [str(v).strip() if v is not None else None for v in next(filas, ())]
+        posiciones = {}
+        for i, nombre in enumerate(encabezado):
+            if nombre in COLUMNS and nombre not in posiciones:
+                posiciones[nombre] = i
+        faltantes = [col for col in REQUIRED_COLUMNS if col not in posiciones]
+        if faltantes:
+            raise KeyError(f"Faltan columnas en el Excel: {', '.join(faltantes)}")
+        nombres = sorted(posiciones, key=posiciones.get)
+        tomar = operator.itemgetter(*(posiciones[nombre] for nombre in nombres))
+        i_estatus = nombres.index('Estatus')
+        ancho = len(encabezado)
+        indice, valores = [], []
+        for n, fila in enumerate(filas):
+            if len(fila) < ancho:
+                fila += (None,) * (ancho - len(fila))
+            celdas = tomar(fila)
+            estatus = _cell_text(celdas[i_estatus])
+            if estatus is not None and ESTATUS_VALIDO.match(estatus):
+                indice.append(n)
+                valores.append(celdas)
+    finally:
+        wb.close()
+    columnas = list(zip(*valores)) if valores else [()] * len(nombres)
+    return indice, dict(zip(nombres, columnas))
+
+
+def read_workbook(data):
+    indice, columnas = _read_sheet(data)
+    datos, texto_tss = {}, None
+    for nombre, valores in columnas.items():
+        if nombre in TEXT_COLUMNS:
+            datos[nombre] = [_cell_text(v) for v in valores]
+        elif nombre in LOWER_COLUMNS:
+            datos[nombre] = [v.strip().lower() if v is not None else None for v in map(_cell_text, valores)]
+        elif nombre in NUMERIC_COLUMNS:
+            datos[nombre] = np.array([_cell_number(v) for v in valores], dtype=float)
+        elif nombre == 'Fecha TSS':
+            # La Fecha TSS mezcla fechas reales con textos tipo "W12": el texto original se guarda aparte.
+            datos[nombre] = [None if isinstance(v, str) else v for v in valores]
+            texto_tss = [v if isinstance(v, str) else None for v in valores]
+        else:
+            datos[nombre] = list(valores)
+    if texto_tss is not None:
+        datos['Fecha TSS Texto'] = texto_tss
+    datos['Estatus Limpio'] = [ESTATUS_PREFIJO.sub('', v, count=1) for v in datos['Estatus']]
+    df = pd.DataFrame(datos, index=pd.Index(indice))
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    _normalize_mixed_columns(df)
+    return df
+
+
+def snapshot_path(digest):
+    return CACHE_DIR / f"{digest}-v{SNAPSHOT_VERSION}.parquet"
+
+
+def write_snapshot(df, path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    try:
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+    except (ImportError, OSError, ValueError, TypeError):
+        # El snapshot es solo una caché: si no se puede escribir, se sigue con el DataFrame en memoria.
+        tmp_path.unlink(missing_ok=True)
+
+
+def load_workbook(data, digest=None):
+    digest = digest or file_hash(data)
+    path = snapshot_path(digest)
+    if path.exists():
+        try:
+            return pd.read_parquet(path)
+        except (OSError, ValueError):
+            pass
+    df = read_workbook(data)
+    write_snapshot(df, path)
+    return df
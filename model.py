@@ -0,0 +1,36 @@
+from datetime import datetime
+
+import geo
+import parsing
+
+PROYECTO = 'plan 986'
+COMPLEMENTARIO = 'si'
+
+# Columnas de texto con pocos valores distintos: el modelo es compartido por todas las sesiones.
+CATEGORY_COLUMNS = ['Gestor', 'Sitio', 'Estatus Limpio', 'Stopper', 'Comuna', 'Región', 'Proyecto', 'Complementario']
+
+
+def prepare_model(df_original, proyecto=PROYECTO, complementario=COMPLEMENTARIO, year=None):
+    # Con proyecto y complementario en None se preparan todos los planes del archivo.
+    df = df_original
+    if proyecto is not None:
+        df = df[df['Proyecto'] == proyecto]
+    if complementario is not None:
+        df = df[df['Complementario'] == complementario]
+    df = df.copy()
+    df['Sitio'] = df['AB+ALt'].astype(str) + " - " + df['Nombre Sitio'].astype(str)
+    if 'Fecha TSS' in df.columns:
+        # Las fechas "W<n>" se resuelven contra este año: quien cachea el modelo debe incluirlo en la clave.
+        parsing.resolve_tss(df, year or datetime.now().year)
+    parsing.parse_number_columns(df)
+    if 'Lat' in df.columns and 'Long' in df.columns:
+        geo.assign_cells(df)
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
+
+def split_plans(df):
+    # (Proyecto, Complementario) -> filas de ese plan, en una sola pasada de groupby.
+    return {plan: grupo for plan, grupo in df.groupby(['Proyecto', 'Complementario'], observed=True, sort=True)}
@@ -0,0 +1,82 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# Columna de origen -> columna entera derivada (número de semana u orden del estatus).
+NUMBER_COLUMNS = {
+    'Forecast Firma': 'Week Forecast',
+    'Week Firma': 'Week Real',
+    'Forecast Móvil': 'Week Móvil',
+    'Estatus': 'Estatus Orden',
+}
+# Semanas válidas: el resto ("W2025", "W0") queda como nulo para que quepan en Int16.
+WEEK_RANGE = (1, 53)
+
+STATUS_COLORS = {
+    'Retrasado': '#d93025',  # Rojo
+    'Adelantado': '#1e8e3e',  # Verde
+    'En Fecha': '#1a73e8',  # Azul
+}
+
+
+def extract_number(series, dtype='Int16', valid_range=None):
+    # Las columnas de semana tienen pocos valores distintos ("W12", "W 13"...): se aplica la
+    # expresión regular solo sobre los valores únicos y se expande con los códigos.
+    codes, uniques = pd.factorize(series)
+    parsed = pd.to_numeric(pd.Series(uniques, dtype=object).astype('string').str.extract(r'(\d+)', expand=False), errors='coerce')
+    lookup = np.append(parsed.to_numpy(dtype='float64', na_value=np.nan), np.nan)
+    lookup[lookup > np.iinfo(pd.api.types.pandas_dtype(dtype).numpy_dtype).max] = np.nan
+    if valid_range is not None:
+        lookup[(lookup < valid_range[0]) | (lookup > valid_range[1])] = np.nan
+    return pd.Series(lookup[codes], index=series.index).astype(dtype)
+
+
+def parse_number_columns(df):
+    for source, target in NUMBER_COLUMNS.items():
+        if source in df.columns:
+            df[target] = extract_number(df[source], valid_range=None if source == 'Estatus' else WEEK_RANGE)
+    return df
+
+
+def classify_variation(variacion):
+    variacion = np.asarray(variacion)
+    status = np.select([variacion > 0, variacion < 0], ['Retrasado', 'Adelantado'], default='En Fecha')
+    return pd.Categorical(status, categories=list(STATUS_COLORS))
+
+
+def iso_week_monday(year, weeks):
+    # Equivalente vectorizado de datetime.fromisocalendar(year, week, 1); semanas inexistentes -> NaT.
+    weeks = pd.Series(weeks, dtype='float64')
+    semanas_del_anio = date(year, 12, 28).isocalendar().week
+    validas = (weeks >= 1) & (weeks <= semanas_del_anio) & (weeks % 1 == 0)
+    enero_4 = pd.Timestamp(year, 1, 4)
+    lunes_semana_1 = enero_4 - pd.Timedelta(days=enero_4.weekday())
+    dias = (weeks.where(validas) - 1) * 7
+    return pd.Series(lunes_semana_1 + pd.to_timedelta(dias.to_numpy(), unit='D'), index=weeks.index)
+
+
+def resolve_tss(df, year):
+    fecha = df['Fecha TSS']
+    texto = df['Fecha TSS Texto'] if 'Fecha TSS Texto' in df.columns else pd.Series(np.nan, index=df.index, dtype=object)
+    orden = fecha.copy()
+    display = fecha.dt.strftime('%d-%m-%Y').copy()
+
+    hay_texto = texto.notna() & fecha.isna()
+    if hay_texto.any():
+        # Se resuelven solo los textos únicos: "W12" -> lunes de esa semana ISO, el resto como fecha libre.
+        codes, uniques = pd.factorize(texto[hay_texto])
+        unicos = pd.Series(uniques, dtype=object).astype(str).str.strip()
+        minusculas = unicos.str.lower()
+        es_semana = minusculas.str.startswith('w')
+        semana = pd.to_numeric(minusculas.str.replace('w', '', regex=False).str.strip(), errors='coerce')
+        resuelto = iso_week_monday(year, semana.where(es_semana))
+        libres = ~es_semana & (unicos != '')
+        if libres.any():
+            resuelto[libres] = pd.to_datetime(unicos[libres], errors='coerce', format='mixed')
+        orden[hay_texto] = resuelto.to_numpy()[codes]
+        display[hay_texto] = unicos.to_numpy()[codes]
+
+    df['Fecha TSS Orden'] = orden
+    df['Fecha TSS Display'] = display
+    return df
@@ -0,0 +1,91 @@
+"""Precalcula los agregados del dashboard PLAN 986 fuera de Streamlit.
+
+Uso: python precompute.py PLAN986.xlsx --out artifacts
+
+Escribe el modelo preparado (model.parquet), un bundle de agregados por Gestor y
+para "Todos", y un manifest.json. El dashboard los lee si PLAN986_ARTIFACTS_DIR
+apunta a esa carpeta.
+"""
+import argparse
+import json
+import os
+import re
+import unicodedata
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+import aggregates
+import ingest
+import model
+
+MANIFEST_NAME = 'manifest.json'
+MODEL_NAME = 'model.parquet'
+TODOS = 'Todos'
+
+
+def slugify(nombre):
+    ascii_name = unicodedata.normalize('NFKD', str(nombre)).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', '-', ascii_name.lower()).strip('-') or 'gestor'
+
+
+def write_artifacts(df, out_dir, file_hash):
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    df.to_parquet(out_dir / MODEL_NAME)
+
+    carpetas = {}
+    for gestor in [TODOS] + sorted(df['Gestor'].dropna().unique().tolist()):
+        subset = df if gestor == TODOS else df[df['Gestor'] == gestor]
+        slug, n = slugify(gestor), 2
+        while slug in carpetas.values():
+            slug, n = f"{slugify(gestor)}-{n}", n + 1
+        aggregates.save_bundle(aggregates.build_bundle(subset), out_dir / slug)
+        carpetas[gestor] = slug
+
+    manifest = {
+        'file_hash': file_hash,
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'rows': int(len(df)),
+        'gestores': carpetas,
+    }
+    tmp_path = out_dir / f"{MANIFEST_NAME}.tmp"
+    tmp_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding='utf-8')
+    os.replace(tmp_path, out_dir / MANIFEST_NAME)
+    return manifest
+
+
+def read_manifest(out_dir):
+    path = Path(out_dir) / MANIFEST_NAME
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def load_model(out_dir):
+    return pd.read_parquet(Path(out_dir) / MODEL_NAME)
+
+
+def load_bundle(out_dir, manifest, gestor):
+    carpeta = manifest['gestores'].get(gestor)
+    if carpeta is None:
+        return None
+    return aggregates.load_bundle(Path(out_dir) / carpeta)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('workbook', help="Archivo Excel PLAN986.xlsx")
+    parser.add_argument('--out', default='artifacts', help="Carpeta de salida (por defecto: artifacts)")
+    args = parser.parse_args(argv)
+
+    data = Path(args.workbook).read_bytes()
+    file_hash = ingest.file_hash(data)
+    df = model.prepare_model(ingest.load_workbook(data, file_hash))
+    manifest = write_artifacts(df, args.out, file_hash)
+    print(f"{manifest['rows']} sitios, {len(manifest['gestores'])} bundles escritos en {args.out}")
+
+
+if __name__ == '__main__':
+    main()
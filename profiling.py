@@ -0,0 +1,62 @@
+import json
+import os
+import time
+from datetime import datetime
+
+import ingest
+
+PROFILE_ENV = "PLAN986_PROFILE"
+PROFILE_LOG = os.environ.get("PLAN986_PROFILE_LOG", ingest.CACHE_DIR / "profile.jsonl")
+
+
+def enabled_by_env():
+    return os.environ.get(PROFILE_ENV, "").lower() in ("1", "true", "si", "yes")
+
+
+class RenderProfiler:
+    # Cronómetro por vueltas: cada lap() cierra la sección anterior y abre la siguiente.
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.sections = []
+        self.figures = []
+        self._inicio = time.perf_counter()
+        self._actual = None
+        self._desde = None
+
+    def lap(self, name):
+        if not self.enabled:
+            return
+        ahora = time.perf_counter()
+        if self._actual is not None:
+            self.sections.append({'section': self._actual, 'ms': round((ahora - self._desde) * 1000, 2)})
+        self._actual, self._desde = name, ahora
+
+    def figure(self, name, fig):
+        if not self.enabled:
+            return
+        inicio = time.perf_counter()
+        payload = fig.to_json()
+        self.figures.append({
+            'figure': name,
+            'traces': len(fig.data),
+            'shapes': len(fig.layout.shapes),
+            'bytes': len(payload),
+            'serialize_ms': round((time.perf_counter() - inicio) * 1000, 2),
+        })
+
+    def finish(self, **context):
+        self.lap(None)
+        return {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'total_ms': round((time.perf_counter() - self._inicio) * 1000, 2),
+            **context,
+            'sections': self.sections,
+            'figures': self.figures,
+        }
+
+
+def append_jsonl(record, path=PROFILE_LOG):
+    path = os.fspath(path)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")